@@ -3,13 +3,25 @@ import sounddevice as sd
 from scipy.io.wavfile import write
 import subprocess
 import os
-import re
 import sys
 from dotenv import load_dotenv
 import logging
 import sys
 import os
+import collections
+import struct
+import tempfile
+import threading
+import time
 from datetime import datetime
+from whisper_engine import WhisperEngine
+from whisper_cli import clean_whisper_output, run_whisper_cli
+from vad import VoiceActivityDetector
+from microphone_stream import MicrophoneStream
+from wakeword import KeywordSpotter
+from calibrate_whisper import load_calibration
+from audio_preprocess import preprocess, resample, to_float
+from tracing import traced
 
 # Create logs directory if it doesn't exist
 if not os.path.exists('logs'):
@@ -36,9 +48,54 @@ logger.info(f"Logging initialized for {__name__}")
 
 load_dotenv()
 
+# Whisper expects 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+
+def wav_chunks(audio, sample_rate=SAMPLE_RATE):
+    """
+    Wraps an int16 buffer in a WAV header without copying the samples.
+
+    Parameters:
+        audio (numpy.ndarray): Mono int16 samples.
+        sample_rate (int): Sample rate of the audio.
+
+    Returns:
+        list: The 44-byte WAV header followed by a memoryview of the samples.
+    """
+    audio = np.ascontiguousarray(audio, dtype=np.int16)
+    data_size = audio.nbytes
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", data_size
+    )
+    return [header, memoryview(audio).cast("B")]
+
+
 class STT:
     def __init__(self):
         self.microphone = self.list_and_select_microphone()
+        # Use the model and thread count picked by calibrate_whisper.py, if any
+        self.calibration = load_calibration()
+        # Load the whisper model once into a resident server process
+        self.engine = WhisperEngine.from_env(threads=self.calibration.get("threads"),
+                                             model_path=self.calibration.get("model_path")) if self.microphone else None
+        self.stream = None
+        self.input_rate = SAMPLE_RATE
+        self.whisper_rtf = self.calibration.get("rtf")
+        self.last_preprocess = None
+        if self.microphone:
+            # Capture at the device's native rate and resample for whisper afterwards
+            self.input_rate = int(self.microphone.get('default_samplerate') or SAMPLE_RATE)
+            # Keep the microphone open for the whole session so recordings start instantly
+            self.stream = MicrophoneStream(self.microphone['index'], samplerate=self.input_rate)
+            self.stream.start()
+        # Idle listening waits for the wake phrase, or for sustained speech when none is enrolled
+        self.spotter = KeywordSpotter.load()
+        self.idle_mode = os.getenv("STT_IDLE_MODE", "1" if self.spotter else "0") == "1"
+        self.last_stream_timings = None
 
     def list_and_select_microphone(self):
         """
@@ -88,48 +145,460 @@ class STT:
             logger.info(f"An error occurred while listing microphones: {e}")
             return None
 
-    def record_audio(self, filename, duration=5):
+    @traced("stt.record")
+    def record_audio(self, filename=None, duration=5, pre_roll=None):
         """
-        Records audio from the selected microphone and saves it as a .wav file at 16 kHz.
+        Records audio from the selected microphone and prepares it as 16 kHz 16-bit PCM.
+
+        The samples are sliced out of the always-open microphone stream, starting `pre_roll`
+        seconds before the request so the first syllables are not clipped, and then resampled,
+        trimmed and normalized. If a filename is given the recording is also saved as a .wav
+        file, which is useful for debugging.
 
         Parameters:
-            filename (str): The name of the .wav file to save the recording.
+            filename (str, optional): The name of the .wav file to save the recording.
             duration (int): The duration of the recording in seconds.
+            pre_roll (float, optional): Seconds of audio kept from before the request.
+                Defaults to STT_PRE_ROLL or 0.3 seconds.
+
+        Returns:
+            numpy.ndarray or None: The recorded int16 samples.
         """
         if not self.microphone:
             logger.info("No microphone selected. Exiting.")
             return
 
-        # Set the selected microphone as the input device
-        try:
-            sd.default.device = self.microphone['index']
+        if pre_roll is None:
+            pre_roll = float(os.getenv("STT_PRE_ROLL", "0.3"))
 
-            # Define 16 kHz as the sample rate
-            sample_rate = 16000
+        try:
+            start = self.stream.position - int(pre_roll * self.input_rate)
+            end = self.stream.position + int(duration * self.input_rate)
             print(f"Recording for {duration} seconds...")
             logger.info("Recording...")
-            audio_data = sd.rec(int(duration * sample_rate), samplerate=sample_rate, channels=1)
-            sd.wait()  # Wait until the recording is finished
+            if not self.stream.wait_for(end, timeout=duration + 5):
+                logger.info("The microphone stopped delivering audio.")
+            audio_data = self.prepare_audio(self.stream.read(start, end))
             logger.info("Recording complete.")
 
-            # Save as a .wav file at 16-bit PCM format
-            audio_data = np.int16(audio_data * 32767)
-            write(filename, sample_rate, audio_data)
-            logger.info(f"Audio saved as {filename}")
+            if filename:
+                # Save as a .wav file at 16-bit PCM format
+                write(filename, SAMPLE_RATE, audio_data)
+                logger.info(f"Audio saved as {filename}")
+            return audio_data
         except Exception as e:
             logger.info(f"An error occurred during recording: {e}")
 
-    def process_audio_with_whisper(self, file_path):
+    @traced("stt.record")
+    def record_until_silence(self, max_duration=15, trailing_silence=0.8, pre_roll=None, min_speech=0.15,
+                             on_audio=None, start=None, stop=None):
         """
-        Processes a WAV file using the Whisper.cpp binary, extracts plain text sentences from the output,
-        and deletes the file after processing.
+        Records from the selected microphone until the speaker stops talking.
+
+        Audio is read from the always-open microphone stream, starting `pre_roll` seconds before
+        the request. Capture starts on speech onset and stops after `trailing_silence` seconds
+        without speech, or after `max_duration` seconds of capture. The returned buffer is trimmed
+        to the spoken part plus up to `pre_roll` seconds before the onset.
 
         Parameters:
-            file_path (str): The full path to the WAV file to be processed.
+            max_duration (float): Maximum length of the captured utterance in seconds.
+            trailing_silence (float): Seconds of silence that end the utterance.
+            pre_roll (float, optional): Seconds of audio kept from before the request and the
+                detected onset. Defaults to STT_PRE_ROLL or 0.3 seconds.
+            min_speech (float): Seconds of continuous speech required to detect an onset.
+            on_audio (callable, optional): Called with each captured block (starting with the
+                pre-roll) while recording is still running.
+            start (int, optional): Absolute stream position to start reading from instead of
+                the request time, e.g. the speech onset found by wait_for_wake().
+            stop (threading.Event, optional): Gives up, returning None, once set, even in the middle
+                of an utterance.
+
+        Returns:
+            numpy.ndarray or None: The trimmed int16 samples at the microphone's native rate.
+        """
+        if not self.microphone:
+            logger.info("No microphone selected. Exiting.")
+            return
+
+        if pre_roll is None:
+            pre_roll = float(os.getenv("STT_PRE_ROLL", "0.3"))
+
+        vad = VoiceActivityDetector(sample_rate=self.input_rate)
+        frame_length = vad.frame_length
+        frame_seconds = frame_length / self.input_rate
+
+        pre_roll_frames = collections.deque(maxlen=max(1, int(pre_roll / frame_seconds)))
+        captured = []
+        speech_run = 0
+        silence_run = 0
+        last_speech = 0
+        onset = False
+        done = False
+        if start is None:
+            start = self.stream.position - int(pre_roll * self.input_rate)
+        cursor = max(start, self.stream.oldest)
+
+        try:
+            print("Listening...")
+            logger.info("Waiting for speech...")
+            while not done:
+                if stop is not None and stop.is_set():
+                    return
+                # Process everything the stream has delivered, a whole number of frames at a time
+                self.stream.wait_for(cursor + frame_length, timeout=0.25 if stop is not None else 1.0)
+                available = (self.stream.position - cursor) // frame_length * frame_length
+                if available <= 0:
+                    continue
+                chunk = self.stream.read(cursor, cursor + available)
+                cursor += len(chunk)
+                frames = chunk[:len(chunk) // frame_length * frame_length].reshape(-1, frame_length)
+
+                for block, is_speech in zip(frames, vad.is_speech(chunk)):
+                    if not onset:
+                        pre_roll_frames.append(block)
+                        speech_run = speech_run + 1 if is_speech else 0
+                        if speech_run * frame_seconds >= min_speech:
+                            onset = True
+                            captured.extend(pre_roll_frames)
+                            last_speech = len(captured)
+                            logger.info("Speech detected. Recording...")
+                            if on_audio:
+                                for frame in pre_roll_frames:
+                                    on_audio(frame)
+                        continue
+
+                    captured.append(block)
+                    if on_audio:
+                        on_audio(block)
+                    if is_speech:
+                        silence_run = 0
+                        last_speech = len(captured)
+                    else:
+                        silence_run += 1
+
+                    if silence_run * frame_seconds >= trailing_silence:
+                        logger.info("End of speech detected.")
+                        done = True
+                        break
+                    if len(captured) * frame_seconds >= max_duration:
+                        logger.info(f"Reached the maximum recording length of {max_duration} seconds.")
+                        done = True
+                        break
+        except Exception as e:
+            logger.info(f"An error occurred during recording: {e}")
+            return
+
+        # Keep a short tail after the last speech frame so word endings are not clipped
+        tail = int(0.2 / frame_seconds)
+        audio_data = np.concatenate(captured[:last_speech + tail])
+        logger.info(f"Recording complete ({len(audio_data) / self.input_rate:.2f}s).")
+        return audio_data
+
+    def wait_for_wake(self, timeout=None, sustained_speech=None, gap=0.3):
+        """
+        Idles on the microphone stream until the user wants to talk, without running whisper.
+
+        Only the energy VAD runs on every frame. When a wake phrase has been enrolled, each speech
+        segment of a plausible length is compared against it with MFCC + DTW. Otherwise the
+        assistant wakes once speech has lasted `sustained_speech` seconds.
+
+        Parameters:
+            timeout (float, optional): Give up after this many seconds.
+            sustained_speech (float, optional): Seconds of speech that wake the assistant when no
+                wake phrase is enrolled. Defaults to STT_WAKE_SPEECH or 1.0 seconds.
+            gap (float): Seconds of silence that end a speech segment.
+
+        Returns:
+            int or None: The stream position where the command starts (the onset of sustained
+            speech), or None after a wake phrase or a timeout, meaning listening starts now.
+        """
+        if sustained_speech is None:
+            sustained_speech = float(os.getenv("STT_WAKE_SPEECH", "1.0"))
+
+        vad = VoiceActivityDetector(sample_rate=self.input_rate)
+        frame_length = vad.frame_length
+        pre_roll = int(float(os.getenv("STT_PRE_ROLL", "0.3")) * self.input_rate)
+        gap_frames = int(gap * self.input_rate / frame_length)
+
+        started = time.perf_counter()
+        started_cpu = time.process_time()
+        cursor = self.stream.position
+        segment_start = None
+        segment_end = None
+        speech_frames = 0
+        silence_run = 0
+        woken_at = None
+        phrase_heard = False
+
+        logger.info("Idle listening...")
+        while woken_at is None and not phrase_heard:
+            if timeout is not None and time.perf_counter() - started >= timeout:
+                break
+
+            # Wake up a few times a second and analyse everything that arrived in one go
+            self.stream.wait_for(cursor + self.input_rate // 10, timeout=1.0)
+            available = (self.stream.position - cursor) // frame_length * frame_length
+            if available <= 0:
+                continue
+            chunk = self.stream.read(cursor, cursor + available)
+            flags = vad.is_speech(chunk)
+
+            for i, is_speech in enumerate(flags):
+                position = cursor + i * frame_length
+                if is_speech:
+                    if segment_start is None:
+                        segment_start = position
+                    segment_end = position + frame_length
+                    speech_frames += 1
+                    silence_run = 0
+                    if self.spotter is None and speech_frames * frame_length >= sustained_speech * self.input_rate:
+                        logger.info("Sustained speech detected.")
+                        woken_at = max(segment_start - pre_roll, self.stream.oldest)
+                        break
+                elif segment_start is not None:
+                    silence_run += 1
+                    if silence_run < gap_frames:
+                        continue
+                    if self.spotter is not None:
+                        segment = self.stream.read(segment_start - pre_roll, segment_end + int(0.2 * self.input_rate))
+                        matched, distance = self.spotter.match(resample(to_float(segment), self.input_rate))
+                        if matched:
+                            logger.info(f"Wake phrase detected (distance {distance:.3f}).")
+                            phrase_heard = True
+                            break
+                    segment_start = None
+                    speech_frames = 0
+            cursor += available
+
+        elapsed = time.perf_counter() - started
+        if elapsed > 0:
+            logger.info(f"Idle listening used {100 * (time.process_time() - started_cpu) / elapsed:.1f}% "
+                        f"of one core over {elapsed:.1f}s")
+        return woken_at
+
+    @traced("stt.listen")
+    def listen(self, max_duration=15, trailing_silence=None, start=None):
+        """
+        Records one utterance, ending on trailing silence, and returns its transcription.
+
+        The audio stays in memory unless STT_DEBUG_WAV is set, in which case the recording
+        goes through a .wav file at that path as before.
+
+        Parameters:
+            max_duration (float): Maximum length of the utterance in seconds.
+            trailing_silence (float, optional): Seconds of silence that end the utterance.
+                Defaults to STT_TRAILING_SILENCE or 0.8 seconds.
+            start (int, optional): Absolute stream position to start listening from.
+
+        Returns:
+            str or None: The transcribed text.
+        """
+        if trailing_silence is None:
+            trailing_silence = float(os.getenv("STT_TRAILING_SILENCE", "0.8"))
+
+        # Stream partial transcripts while recording when the resident server can keep up
+        if self.engine is not None and os.getenv("STT_STREAMING", "1") == "1" and not os.getenv("STT_DEBUG_WAV"):
+            return self.listen_streaming(max_duration=max_duration, trailing_silence=trailing_silence, start=start)
+
+        audio_data = self.record_until_silence(max_duration=max_duration, trailing_silence=trailing_silence,
+                                               start=start)
+        if audio_data is None:
+            return None
+        audio_data = self.prepare_audio(audio_data)
+
+        debug_wav = os.getenv("STT_DEBUG_WAV")
+        if debug_wav:
+            write(debug_wav, SAMPLE_RATE, audio_data)
+            logger.info(f"Audio saved as {debug_wav}")
+            return self.process_audio_with_whisper(debug_wav)
+
+        return self.process_audio_with_whisper(audio=audio_data)
+
+    def listen_until(self, stop, max_duration=3, trailing_silence=None):
+        """
+        Listens for a short utterance in the background, e.g. "stop" while a command runs.
+
+        Unlike listen(), this gives up as soon as `stop` is set, even in the middle of an utterance,
+        and transcribes only once the utterance has ended, so the caller can take over the
+        recognizer as soon as it returns. No pre-roll is kept, so the end of a prompt the assistant
+        has just spoken is not picked up.
+
+        Returns:
+            str or None: The transcribed text, or None if `stop` was set first or there is no microphone.
+        """
+        if trailing_silence is None:
+            trailing_silence = float(os.getenv("STT_TRAILING_SILENCE", "0.8"))
+        audio_data = self.record_until_silence(max_duration=max_duration, trailing_silence=trailing_silence,
+                                               pre_roll=0, stop=stop)
+        if audio_data is None or stop.is_set():
+            return None
+        return self.process_audio_with_whisper(audio=self.prepare_audio(audio_data))
+
+    def stream_transcribe(self, max_duration=15, trailing_silence=0.8, step=1.0, window=20.0, on_partial=None,
+                          start=None):
+        """
+        Transcribes while the user is still speaking.
+
+        Recording runs on a background thread. Every `step` seconds the audio that has not been
+        committed yet is transcribed again, so successive windows overlap and the hypothesis
+        improves as more speech arrives. Once the uncommitted audio exceeds `window` seconds,
+        that window is transcribed one last time and its text is committed. When the speaker
+        stops, a final transcript is produced, reusing the last partial if it already covered
+        all of the audio.
+
+        Parameters:
+            max_duration (float): Maximum length of the utterance in seconds.
+            trailing_silence (float): Seconds of silence that end the utterance.
+            step (float): Seconds between partial transcriptions.
+            window (float): Maximum seconds of audio in one transcription window.
+            on_partial (callable, optional): Called with each partial transcript.
+            start (int, optional): Absolute stream position to start listening from.
+
+        Yields:
+            dict: {"text": str, "final": bool, "elapsed": seconds since the call started}.
+        """
+        blocks = []
+        result = {}
+        new_audio = threading.Event()
+
+        def on_audio(block):
+            blocks.append(block)
+            new_audio.set()
+
+        def record():
+            result["audio"] = self.record_until_silence(max_duration=max_duration,
+                                                        trailing_silence=trailing_silence,
+                                                        on_audio=on_audio, start=start)
+            result["ended"] = time.perf_counter()
+            new_audio.set()
+
+        started = time.perf_counter()
+        recorder = threading.Thread(target=record, daemon=True)
+        recorder.start()
+
+        window_samples = int(window * self.input_rate)
+        committed_text = []
+        committed_samples = 0
+        partial_text = None
+        partial_samples = 0
+        timings = {"partials": []}
+
+        while recorder.is_alive():
+            new_audio.wait(step)
+            new_audio.clear()
+            if not recorder.is_alive() or not blocks:
+                continue
+
+            audio_data = np.concatenate(blocks[:])
+            pending = audio_data[committed_samples:]
+            if len(pending) - (partial_samples - committed_samples) < int(step * self.input_rate):
+                continue
+
+            commit = len(pending) >= window_samples
+            if commit:
+                pending = pending[:window_samples]
+
+            text = self.process_audio_with_whisper(audio=self.prepare_audio(pending))
+            if commit:
+                if text:
+                    committed_text.append(text)
+                committed_samples += len(pending)
+                partial_text = None
+                partial_samples = committed_samples
+            else:
+                partial_text = text
+                partial_samples = committed_samples + len(pending)
+
+            hypothesis = " ".join(committed_text + ([partial_text] if partial_text else []))
+            if hypothesis:
+                elapsed = time.perf_counter() - started
+                timings["partials"].append(elapsed)
+                if on_partial:
+                    on_partial(hypothesis)
+                yield {"text": hypothesis, "final": False, "elapsed": elapsed}
+
+        audio_data = result.get("audio")
+        if audio_data is None:
+            return
+
+        if partial_samples >= len(audio_data):
+            final_text = partial_text
+        elif committed_samples >= len(audio_data):
+            final_text = None
+        else:
+            final_text = self.process_audio_with_whisper(audio=self.prepare_audio(audio_data[committed_samples:]))
+        final_text = " ".join(committed_text + ([final_text] if final_text else [])) or None
+
+        now = time.perf_counter()
+        timings["final"] = now - started
+        timings["after_speech"] = now - result["ended"]
+        self.last_stream_timings = timings
+        if timings["partials"]:
+            logger.info(f"First partial transcript after {timings['partials'][0]:.2f}s")
+        logger.info(f"Final transcript {timings['after_speech']:.3f}s after the end of speech "
+                    f"({len(timings['partials'])} partials)")
+        yield {"text": final_text, "final": True, "elapsed": timings["final"]}
+
+    def listen_streaming(self, max_duration=15, trailing_silence=0.8, on_partial=None, start=None):
+        """
+        Records one utterance with streaming transcription and returns the final transcript.
+
+        Parameters:
+            max_duration (float): Maximum length of the utterance in seconds.
+            trailing_silence (float): Seconds of silence that end the utterance.
+            on_partial (callable, optional): Called with each partial transcript.
+            start (int, optional): Absolute stream position to start listening from.
+
+        Returns:
+            str or None: The final transcribed text.
+        """
+        final_text = None
+        for event in self.stream_transcribe(max_duration=max_duration, trailing_silence=trailing_silence,
+                                            on_partial=on_partial, start=start):
+            if event["final"]:
+                final_text = event["text"]
+            else:
+                print(f"... {event['text']}")
+        return final_text
+
+    def prepare_audio(self, audio_data):
+        """
+        Resamples a recording from the microphone's native rate to 16 kHz, trims silence and
+        normalizes it, and logs the cost next to the whisper time saved by the trimming.
+
+        Parameters:
+            audio_data (numpy.ndarray): int16 samples at the native rate.
+
+        Returns:
+            numpy.ndarray: int16 samples at 16 kHz.
+        """
+        audio_data, stats = preprocess(audio_data, self.input_rate)
+        removed = stats["input_seconds"] - stats["output_seconds"]
+        if self.whisper_rtf is not None:
+            stats["whisper_seconds_saved"] = removed * self.whisper_rtf
+        self.last_preprocess = stats
+
+        message = f"Preprocessing took {1000 * stats['seconds']:.1f} ms and trimmed {removed:.2f}s of audio"
+        if "whisper_seconds_saved" in stats:
+            message += f", saving about {1000 * stats['whisper_seconds_saved']:.0f} ms of whisper time"
+        logger.info(message)
+        return audio_data
+
+    @traced("stt.whisper")
+    def process_audio_with_whisper(self, file_path=None, audio=None):
+        """
+        Transcribes a WAV file or an in-memory int16 buffer using the resident Whisper.cpp server
+        (or the one-shot binary when the server is unavailable) and extracts plain text sentences
+        from the output. A WAV file is deleted after processing.
+
+        Parameters:
+            file_path (str, optional): The full path to the WAV file to be processed.
+            audio (numpy.ndarray, optional): 16 kHz int16 samples, used instead of a file.
         """
         # Define the path to the main binary and the model
         main_path = os.environ['WHISPER_MAIN_PATH']
-        model_path = os.environ['WHISPER_MODEL_PATH']
+        model_path = self.calibration.get("model_path") or os.environ['WHISPER_MODEL_PATH']
+        threads = self.calibration.get("threads")
 
         if not main_path or not model_path:
             logger.info("Error: Whisper main path or model path is not set.")
@@ -146,41 +615,47 @@ class STT:
             return            
 
         # Check if the WAV file exists
-        if not os.path.isfile(file_path):
+        if audio is None and (not file_path or not os.path.isfile(file_path)):
             logger.info(f"Error: The file '{file_path}' does not exist.")
             return
 
-        # Construct the command
-        command = [
-            main_path,
-            "-m", model_path,
-            "-f", file_path
-        ]
-
+        started = time.perf_counter()
         try:
-            # Execute the command
-            logger.info(f"Running command: {' '.join(command)}")
-            result = subprocess.run(command, check=True, text=True, capture_output=True)
+            if self.engine is not None:
+                if audio is not None:
+                    wav_data = wav_chunks(audio)
+                else:
+                    with open(file_path, "rb") as f:
+                        wav_data = f.read()
+                logger.info("Sending audio to the resident whisper server.")
+                raw_output = self.engine.transcribe(wav_data)
+                mode = "resident"
+            elif audio is not None:
+                raw_output = self._run_whisper_on_buffer(main_path, model_path, audio, threads)
+                mode = "one-shot"
+            else:
+                raw_output = run_whisper_cli(main_path, model_path, file_path, threads=threads)
+                mode = "one-shot"
+
+            elapsed = time.perf_counter() - started
+            logger.info(f"Transcription took {elapsed:.3f}s ({mode})")
+            if audio is not None and len(audio):
+                # Keep a running real-time factor to price the audio that preprocessing removes
+                rtf = elapsed / (len(audio) / SAMPLE_RATE)
+                self.whisper_rtf = rtf if self.whisper_rtf is None else 0.8 * self.whisper_rtf + 0.2 * rtf
 
             # Extract output and clean it
-            raw_output = result.stdout
-            # Use regex to remove timestamps and keep only the sentences
-            sentences = re.findall(r"(?<=\]\s).*", raw_output)
-            plain_text = " ".join(sentences).strip()
+            cleaned_text = clean_whisper_output(raw_output)
 
-            if not plain_text:
+            if not cleaned_text:
                 logger.info("No text extracted from the audio.")
                 return
-            
-
-            # Further split sentences using punctuation and join with proper spacing
-            cleaned_text = re.sub(r"([.?!])", r"\1\n", plain_text).strip()
 
             # logging.info the cleaned text
             logger.info("Processed Text:")
             logger.info(cleaned_text)
             return cleaned_text
-        
+
 
         except subprocess.CalledProcessError as e:
             logger.info(f"An error occurred while processing the file: {e}")
@@ -189,12 +664,34 @@ class STT:
             logger.info(f"An unexpected error occurred: {e}")
         finally:
             # Delete the file after processing
-            try:
-                os.remove(file_path)
-                logger.info(f"File '{file_path}' has been deleted.")
-            except Exception as e:
-                logger.info(f"An error occurred while deleting the file: {e}")
+            if audio is None:
+                try:
+                    os.remove(file_path)
+                    logger.info(f"File '{file_path}' has been deleted.")
+                except Exception as e:
+                    logger.info(f"An error occurred while deleting the file: {e}")
 
+    def _run_whisper_on_buffer(self, main_path, model_path, audio, threads=None):
+        """
+        Runs the one-shot binary on an in-memory buffer. On Linux the WAV is placed in an
+        anonymous memfd that the child reads through /proc; elsewhere a temporary file is used.
+        """
+        if hasattr(os, "memfd_create"):
+            fd = os.memfd_create("blindsight_audio")
+            try:
+                for chunk in wav_chunks(audio):
+                    os.write(fd, chunk)
+                return run_whisper_cli(main_path, model_path, f"/proc/self/fd/{fd}", threads=threads, pass_fds=(fd,))
+            finally:
+                os.close(fd)
+
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+            for chunk in wav_chunks(audio):
+                f.write(chunk)
+        try:
+            return run_whisper_cli(main_path, model_path, f.name, threads=threads)
+        finally:
+            os.remove(f.name)
 
 if __name__ == "__main__":
     soundbox = STT()
@@ -1,8 +1,14 @@
 import pyttsx3
 import logging
+import queue
+import re
 import sys
 import os
+import threading
+import time
 from datetime import datetime
+from pynput import keyboard
+from tracing import current_span, traced
 
 # Create logs directory if it doesn't exist
 if not os.path.exists('logs'):
@@ -26,13 +32,59 @@ logger = logging.getLogger(__name__)
 
 # Test logging
 logger.info(f"Logging initialized for {__name__}")
-engine = pyttsx3.init()
+
+
+class NullEngine:
+    """
+    Stands in for pyttsx3 when TTS_BACKEND=null: nothing is played, and each utterance is kept
+    in `spoken` with its monotonic timestamp.
+    """
+
+    def __init__(self):
+        self.spoken = []
+
+    def say(self, text):
+        self.spoken.append((time.monotonic(), text))
+
+    def runAndWait(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def connect(self, topic, callback):
+        pass
+
+
+if os.getenv("TTS_BACKEND", "pyttsx3") == "null":
+    engine = NullEngine()
+else:
+    engine = pyttsx3.init()
+
+# Set to cut off speech started by speak_stream, by a key press or stop_speaking()
+cancel_speech = threading.Event()
+
+# Set while speak_stream is speaking, so a leftover cancel_speech does not cut off speak()
+streaming = threading.Event()
+
+# Timings of the most recent speak_stream call, in seconds
+last_speech_timings = {}
+
+
+def _on_word(name, location, length):
+    # pyttsx3 only allows stopping from inside its own callbacks
+    if streaming.is_set() and cancel_speech.is_set():
+        engine.stop()
+
+
+engine.connect('started-word', _on_word)
 
 # Configure logging
 # logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
 
+@traced("tts.speak")
 def speak(text):
     """
     Speaks the provided text using the pyttsx3 engine.
@@ -47,4 +99,149 @@ def speak(text):
         logger.info("Speech completed successfully.")
     except Exception as e:
         # print(f"An error occurred during speech: {e}")
-        logger.error(f"An error occurred during speech: {e}")
\ No newline at end of file
+        logger.error(f"An error occurred during speech: {e}")
+
+
+def stop_speaking():
+    """
+    Cancels the speech of a running speak_stream call.
+    """
+    cancel_speech.set()
+
+
+class SentenceSegmenter:
+    """
+    Splits streamed text into sentences as soon as each one is complete.
+
+    A sentence ends at '.', '!' or '?' followed by whitespace, or at a newline, so filenames like
+    notes.txt and numbers like 3.5 stay whole. Text that runs past `max_chars` without a boundary
+    is broken at the last comma or space.
+    """
+
+    BOUNDARY = re.compile(r"[.!?]+[\"')\]]*\s+|\n+")
+    ABBREVIATIONS = {"e.g", "i.e", "etc", "vs", "mr", "mrs", "dr"}
+
+    def __init__(self, max_chars=200):
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def feed(self, text):
+        """
+        Adds streamed text.
+
+        Returns:
+            list: The sentences completed by this text.
+        """
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in self.BOUNDARY.finditer(self.buffer):
+            words = self.buffer[start:match.start()].split()
+            if match.group().startswith(".") and words and words[-1].lower() in self.ABBREVIATIONS:
+                continue
+            sentence = self.buffer[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+
+        if len(self.buffer) > self.max_chars:
+            cut = self.buffer.rfind(", ")
+            if cut <= 0:
+                cut = self.buffer.rfind(" ")
+            if cut > 0:
+                sentences.append(self.buffer[:cut + 1].strip())
+                self.buffer = self.buffer[cut + 1:]
+        return sentences
+
+    def flush(self):
+        """
+        Returns whatever is left at the end of the stream.
+        """
+        sentence, self.buffer = self.buffer.strip(), ""
+        return sentence
+
+
+@traced("tts.speak_stream")
+def speak_stream(chunks, started=None):
+    """
+    Speaks streamed text sentence by sentence while the rest is still being generated.
+
+    Any key press, or a call to stop_speaking(), cancels the speech and stops reading the stream.
+    Time to first audio is logged and kept in last_speech_timings.
+
+    Args:
+        chunks (iterable): Pieces of text, e.g. from LLMClient.stream.
+        started (float, optional): time.perf_counter() when the request began. Defaults to now.
+
+    Returns:
+        str: The text received, up to the point of cancellation.
+
+    Raises:
+        Exception: Whatever the stream raised, after the text received before it was spoken.
+    """
+    started = started or time.perf_counter()
+    cancel_speech.clear()
+    sentences = queue.Queue()
+    received = []
+    errors = []
+
+    def produce():
+        segmenter = SentenceSegmenter()
+        try:
+            for chunk in chunks:
+                if cancel_speech.is_set():
+                    break
+                received.append(chunk)
+                for sentence in segmenter.feed(chunk):
+                    sentences.put(sentence)
+            tail = segmenter.flush()
+            if tail:
+                sentences.put(tail)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+            last_speech_timings["generation"] = time.perf_counter() - started
+            sentences.put(None)
+
+    try:
+        listener = keyboard.Listener(on_press=lambda key: stop_speaking())
+        listener.start()
+    except Exception as e:
+        logger.error(f"Keyboard listener unavailable, speech can only be stopped programmatically: {e}")
+        listener = None
+
+    threading.Thread(target=produce, daemon=True).start()
+    first_audio = None
+    streaming.set()
+    try:
+        while not cancel_speech.is_set():
+            sentence = sentences.get()
+            if sentence is None:
+                break
+            if first_audio is None:
+                first_audio = time.perf_counter() - started
+                logger.info(f"Time to first audio: {first_audio:.2f}s")
+            try:
+                engine.say(sentence)
+                engine.runAndWait()
+            except Exception as e:
+                logger.error(f"An error occurred during speech: {e}")
+                cancel_speech.set()
+    finally:
+        streaming.clear()
+        if listener is not None:
+            listener.stop()
+
+    cancelled = cancel_speech.is_set()
+    last_speech_timings.update(time_to_first_audio=first_audio, total=time.perf_counter() - started,
+                               cancelled=cancelled)
+    if current_span() is not None:
+        current_span().set(time_to_first_audio=first_audio, cancelled=cancelled)
+    logger.info(f"Streamed speech {'cancelled' if cancelled else 'completed'}: {last_speech_timings}")
+    if errors:
+        raise errors[0]
+    return "".join(received).strip()
@@ -0,0 +1,108 @@
+import math
+import time
+
+import numpy as np
+from scipy.signal import resample_poly
+
+from vad import VoiceActivityDetector
+
+# Whisper expects 16 kHz mono audio
+TARGET_RATE = 16000
+
+
+def to_float(audio):
+    """
+    Converts int16 samples to float32 in [-1, 1]. Float input is returned as a flat float32 array.
+    """
+    samples = np.asarray(audio).reshape(-1)
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32, copy=False)
+
+
+def to_int16(audio):
+    """
+    Converts float samples to int16, clipping and scaling in place.
+    """
+    np.clip(audio, -1.0, 1.0, out=audio)
+    audio *= 32767.0
+    return audio.astype(np.int16)
+
+
+def resample(audio, orig_rate, target_rate=TARGET_RATE):
+    """
+    Resamples float audio with a polyphase anti-aliasing filter.
+
+    Args:
+        audio (numpy.ndarray): Float samples.
+        orig_rate (int): Sample rate of the input.
+        target_rate (int): Desired sample rate.
+
+    Returns:
+        numpy.ndarray: The resampled float32 samples.
+    """
+    if orig_rate == target_rate:
+        return audio
+    divisor = math.gcd(int(orig_rate), int(target_rate))
+    return resample_poly(audio, target_rate // divisor, int(orig_rate) // divisor).astype(np.float32)
+
+
+def trim_silence(audio, sample_rate=TARGET_RATE, pad=0.15):
+    """
+    Cuts leading and trailing silence, keeping `pad` seconds around the detected speech.
+
+    Returns:
+        numpy.ndarray: The trimmed samples, or the input unchanged if no speech was found.
+    """
+    vad = VoiceActivityDetector(sample_rate=sample_rate)
+    speech = np.flatnonzero(vad.is_speech(audio))
+    if len(speech) == 0:
+        return audio
+    pad_samples = int(pad * sample_rate)
+    start = max(0, speech[0] * vad.frame_length - pad_samples)
+    end = min(len(audio), (speech[-1] + 1) * vad.frame_length + pad_samples)
+    return audio[start:end]
+
+
+def normalize(audio, target_peak=0.9, target_rms=0.1, max_gain=10.0):
+    """
+    Scales audio in place towards a target RMS level without letting the peak clip.
+
+    Quiet recordings get at most `max_gain` of amplification so background noise is not blown up.
+    """
+    peak = float(np.max(np.abs(audio))) if len(audio) else 0.0
+    if peak == 0.0:
+        return audio
+    rms = float(np.sqrt(np.mean(np.square(audio))))
+    gain = min(target_rms / rms if rms > 0 else max_gain, target_peak / peak, max_gain)
+    audio *= gain
+    return audio
+
+
+def preprocess(audio, sample_rate):
+    """
+    Prepares a recording for whisper: resample to 16 kHz, trim silence and normalize.
+
+    Args:
+        audio (numpy.ndarray): int16 or float samples at `sample_rate`.
+        sample_rate (int): The capture rate of the microphone.
+
+    Returns:
+        tuple: (int16 samples at 16 kHz, stats dict with "input_seconds", "output_seconds"
+        and "seconds" spent preprocessing).
+    """
+    started = time.perf_counter()
+    samples = to_float(audio)
+    input_seconds = len(samples) / sample_rate
+
+    samples = resample(samples, sample_rate)
+    samples = trim_silence(samples)
+    samples = normalize(np.array(samples, dtype=np.float32))
+    result = to_int16(samples)
+
+    stats = {
+        "input_seconds": input_seconds,
+        "output_seconds": len(result) / TARGET_RATE,
+        "seconds": time.perf_counter() - started
+    }
+    return result, stats
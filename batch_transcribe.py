@@ -0,0 +1,165 @@
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from whisper_cli import clean_whisper_output, run_whisper_cli
+
+# Create logs directory if it doesn't exist
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+# Generate timestamp for log filename
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(f"logs/blindsight_{timestamp}.log")
+    ]
+)
+
+# Create logger for the specific module
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+def load_inputs(source):
+    """
+    Collects the recordings to transcribe.
+
+    Args:
+        source (str): A directory (searched recursively for .wav files), a text manifest with one
+            path per line, or a .jsonl manifest with a "path" and an optional reference "text".
+            Relative paths in a manifest are resolved against the manifest's directory.
+
+    Returns:
+        list: Dicts with "path" and, when known, "reference".
+    """
+    if os.path.isdir(source):
+        items = []
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if name.lower().endswith(".wav"):
+                    items.append({"path": os.path.join(root, name)})
+        return sorted(items, key=lambda item: item["path"])
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    items = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if source.lower().endswith(".jsonl"):
+                entry = json.loads(line)
+                item = {"path": entry["path"]}
+                if "text" in entry:
+                    item["reference"] = entry["text"]
+            else:
+                item = {"path": line}
+            item["path"] = os.path.join(base_dir, item["path"])
+            items.append(item)
+    return items
+
+
+def word_error_rate(reference, hypothesis):
+    """
+    Word error rate between a reference transcript and a hypothesis, ignoring case and punctuation.
+    """
+    def words(text):
+        return "".join(c.lower() if c.isalnum() or c.isspace() else " " for c in text or "").split()
+
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return float(bool(hyp))
+
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def transcribe_file(item, main_path, model_path, threads):
+    """
+    Transcribes one recording in a worker process. The source file is only read, never deleted.
+
+    Returns:
+        dict: The result record written to the JSONL output.
+    """
+    record = {"path": item["path"]}
+    started = time.perf_counter()
+    try:
+        raw_output = run_whisper_cli(main_path, model_path, item["path"], threads=threads)
+        record["text"] = clean_whisper_output(raw_output)
+    except subprocess.CalledProcessError as e:
+        record["text"] = None
+        record["error"] = (e.stderr or str(e)).strip()
+    except Exception as e:
+        record["text"] = None
+        record["error"] = str(e)
+    record["seconds"] = round(time.perf_counter() - started, 3)
+
+    if "reference" in item:
+        record["reference"] = item["reference"]
+        record["wer"] = round(word_error_rate(item["reference"], record["text"]), 4)
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe a directory or manifest of WAV files with whisper.cpp.")
+    parser.add_argument("source", help="Directory of .wav files, or a .txt/.jsonl manifest")
+    parser.add_argument("-o", "--output", default=f"transcripts_{timestamp}.jsonl",
+                        help="JSONL file to write (default: transcripts_<timestamp>.jsonl)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: number of cores)")
+    parser.add_argument("-t", "--threads", type=int,
+                        help="whisper.cpp threads per worker (default: cores divided by workers)")
+    args = parser.parse_args()
+
+    main_path = os.environ['WHISPER_MAIN_PATH']
+    model_path = os.environ['WHISPER_MODEL_PATH']
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+
+    items = load_inputs(args.source)
+    if not items:
+        logger.error(f"No recordings found in {args.source}")
+        sys.exit(1)
+    logger.info(f"Transcribing {len(items)} files with {args.workers} workers x {threads} threads")
+
+    started = time.perf_counter()
+    failures = 0
+    errors = []
+    with open(args.output, "w", encoding="utf-8") as output, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(transcribe_file, item, main_path, model_path, threads) for item in items]
+        for future in as_completed(futures):
+            record = future.result()
+            if "error" in record:
+                failures += 1
+            if "wer" in record:
+                errors.append(record["wer"])
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Transcribed {len(items)} files in {elapsed:.2f}s ({failures} failed). Results in {args.output}")
+    if errors:
+        logger.info(f"Mean word error rate: {sum(errors) / len(errors):.3f}")
+
+
+if __name__ == "__main__":
+    main()
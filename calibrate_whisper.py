@@ -0,0 +1,193 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+import wave
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+# Create logs directory if it doesn't exist
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+# Generate timestamp for log filename
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(f"logs/blindsight_{timestamp}.log")
+    ]
+)
+
+# Create logger for the specific module
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Default location of the calibration cache, next to this file so a `cd` does not move it
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "whisper_calibration.json")
+
+
+def cache_path():
+    return os.getenv("WHISPER_CALIBRATION", DEFAULT_CACHE_PATH)
+
+
+def load_calibration():
+    """
+    Loads the cached calibration if it still matches the configured whisper binary.
+
+    Returns:
+        dict: The cached configuration ("model_path", "threads", ...), or an empty dict.
+    """
+    path = cache_path()
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            calibration = json.load(f)
+    except Exception as e:
+        logger.error(f"Could not read the whisper calibration cache {path}: {e}")
+        return {}
+
+    if calibration.get("main_path") != os.getenv("WHISPER_MAIN_PATH") or not os.path.isfile(calibration.get("model_path", "")):
+        logger.info("Whisper calibration cache is stale. Run calibrate_whisper.py again.")
+        return {}
+
+    logger.info(f"Using calibrated whisper settings: {os.path.basename(calibration['model_path'])}, "
+                f"{calibration['threads']} threads (real-time factor {calibration['rtf']:.3f})")
+    return calibration
+
+
+def find_models(model_path):
+    """
+    Lists the ggml models that sit next to the configured one.
+    """
+    models = set(glob.glob(os.path.join(os.path.dirname(model_path), "ggml-*.bin")))
+    models.add(model_path)
+    return sorted(m for m in models if os.path.isfile(m))
+
+
+def clip_duration(clip):
+    with wave.open(clip, "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+
+def measure(main_path, model_path, clip, threads, runs):
+    """
+    Transcribes the clip several times and returns the best decode time in seconds.
+
+    whisper.cpp reports its own timings on stderr. The model load time is subtracted because the
+    resident server only pays it once.
+    """
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([main_path, "-m", model_path, "-f", clip, "-t", str(threads)],
+                                check=True, text=True, capture_output=True)
+        elapsed = time.perf_counter() - started
+
+        load = re.search(r"load time\s*=\s*([\d.]+)\s*ms", result.stderr)
+        total = re.search(r"total time\s*=\s*([\d.]+)\s*ms", result.stderr)
+        if load and total:
+            elapsed = (float(total.group(1)) - float(load.group(1))) / 1000.0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate(clip, target_latency, utterance, runs, thread_counts=None):
+    """
+    Measures every available model at several thread counts and caches the best configuration.
+
+    The chosen configuration is the largest model whose estimated latency for an utterance of
+    `utterance` seconds meets `target_latency`, at its fastest thread count. If no model meets
+    the target, the fastest configuration overall is used.
+
+    Returns:
+        dict: The cached configuration.
+    """
+    main_path = os.environ['WHISPER_MAIN_PATH']
+    model_path = os.environ['WHISPER_MODEL_PATH']
+    duration = clip_duration(clip)
+
+    if not thread_counts:
+        cores = os.cpu_count() or 1
+        thread_counts = sorted({t for t in (1, 2, 4, 6, 8, 12, 16) if t <= cores} | {cores})
+
+    results = []
+    for model in find_models(model_path):
+        for threads in thread_counts:
+            try:
+                seconds = measure(main_path, model, clip, threads, runs)
+            except subprocess.CalledProcessError as e:
+                logger.error(f"Calibration run failed for {model} with {threads} threads: {e.stderr}")
+                continue
+            rtf = seconds / duration
+            results.append({"model_path": model, "threads": threads, "seconds": round(seconds, 3),
+                            "rtf": round(rtf, 4), "model_size": os.path.getsize(model)})
+            logger.info(f"{os.path.basename(model)} with {threads} threads: real-time factor {rtf:.3f}")
+
+    if not results:
+        raise RuntimeError("No calibration run succeeded.")
+
+    fastest_per_model = {}
+    for result in results:
+        best = fastest_per_model.get(result["model_path"])
+        if best is None or result["rtf"] < best["rtf"]:
+            fastest_per_model[result["model_path"]] = result
+
+    meeting_target = [r for r in fastest_per_model.values() if r["rtf"] * utterance <= target_latency]
+    if meeting_target:
+        chosen = max(meeting_target, key=lambda r: r["model_size"])
+    else:
+        logger.info("No configuration meets the target latency. Using the fastest one.")
+        chosen = min(results, key=lambda r: r["rtf"])
+
+    calibration = {
+        "main_path": main_path,
+        "model_path": chosen["model_path"],
+        "threads": chosen["threads"],
+        "rtf": chosen["rtf"],
+        "target_latency": target_latency,
+        "utterance_seconds": utterance,
+        "clip": clip,
+        "calibrated_at": datetime.now().isoformat(timespec="seconds"),
+        "results": results
+    }
+    with open(cache_path(), "w", encoding="utf-8") as f:
+        json.dump(calibration, f, indent=2)
+    logger.info(f"Chose {os.path.basename(chosen['model_path'])} with {chosen['threads']} threads. "
+                f"Saved to {cache_path()}")
+    return calibration
+
+
+def main():
+    default_clip = os.path.join(os.path.dirname(os.getenv("WHISPER_MAIN_PATH", "")), "samples", "jfk.wav")
+    parser = argparse.ArgumentParser(description="Find the fastest whisper.cpp settings for this machine.")
+    parser.add_argument("--clip", default=default_clip,
+                        help="16 kHz WAV clip to transcribe (default: the jfk.wav sample shipped with whisper.cpp)")
+    parser.add_argument("--target-latency", type=float, default=1.0,
+                        help="Maximum seconds to transcribe one utterance (default: 1.0)")
+    parser.add_argument("--utterance", type=float, default=5.0,
+                        help="Length of a typical spoken command in seconds (default: 5.0)")
+    parser.add_argument("--runs", type=int, default=2, help="Runs per configuration; the best is kept")
+    parser.add_argument("--threads", type=int, nargs="+", help="Thread counts to try")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.clip):
+        logger.error(f"Calibration clip '{args.clip}' does not exist.")
+        sys.exit(1)
+    calibrate(args.clip, args.target_latency, args.utterance, args.runs, args.threads)
+
+
+if __name__ == "__main__":
+    main()
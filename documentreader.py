@@ -1,10 +1,13 @@
 from docx import Document
-from groq import Groq
 import os
 from dotenv import load_dotenv
-import pyttsx3
 from pynput import keyboard
 import threading
+from llm_client import get_client
+from filename_resolver import choose_candidate, remember_directory, resolve_filename, stats as resolver_stats
+from TTS import speak_stream
+import TTS
+from tracing import traced
 import sys
 import logging
 import sys
@@ -47,13 +50,8 @@ load_dotenv()
 #     ]
 # )
 
-# Initialize text-to-speech engine
-try:
-    engine = pyttsx3.init()
-    logger.info("pyttsx3 engine initialized successfully.")
-except Exception as e:
-    logger.error(f"Failed to initialize pyttsx3 engine: {e}")
-    sys.exit(1)
+# Share the text-to-speech engine initialized by TTS.py (a null sink when TTS_BACKEND=null)
+engine = TTS.engine
 
 # Global flag for speech interruption
 speaking = False
@@ -74,6 +72,7 @@ def on_press(key):
     speaking = False
     return False  # Stop listener
 
+@traced("doc.speak")
 def speak(text):
     """
     Speaks the provided text using the pyttsx3 engine.
@@ -128,17 +127,12 @@ def speak(text):
     logger.info("Speech synthesis completed or interrupted.")
 
 
-# Initialize Groq client with API key from environment variables
-groq_api_key = os.getenv("GROQ_API_KEY")
-if not groq_api_key:
-    logger.error("GROQ_API_KEY not found in environment variables.")
-    sys.exit(1)
-
+# Use the shared LLM client; pipeline.py and this module talk to the same backend
 try:
-    client = Groq(api_key=groq_api_key)
-    logger.info("Groq client initialized successfully.")
+    llm = get_client()
+    logger.info("LLM client initialized successfully.")
 except Exception as e:
-    logger.error(f"Failed to initialize Groq client: {e}")
+    logger.error(f"Failed to initialize LLM client: {e}")
     sys.exit(1)
 
 def read_docx(filename):
@@ -199,13 +193,15 @@ def write_docx(file_path, content):
         logger.error(f"Error writing to file {file_path}: {e}")
         raise
 
-def doc_operations(document, command):
+@traced("doc.operation")
+def doc_operations(document, command, speak_response=False):
     """
     Processes the document content with the Groq API based on the specified command.
     
     Args:
         document (str or Document): The content of the document.
         command (str): The operation to perform on the document.
+        speak_response (bool): Speak the result sentence by sentence while it is generated.
     
     Returns:
         str: The updated content of the document.
@@ -226,12 +222,11 @@ def doc_operations(document, command):
     ]
 
     try:
-        response = client.chat.completions.create(
-            messages=prompt,
-            model="llama3-70b-8192"
-        )
-        
-        result = response.choices[0].message.content.strip()
+        # The document changes between calls, so this call always reaches the model
+        if speak_response:
+            result = speak_stream(llm.stream(prompt, cache=False))
+        else:
+            result = llm.complete(prompt, cache=False)
         logger.info("Document operation completed successfully.")
         return result
     
@@ -239,6 +234,7 @@ def doc_operations(document, command):
         logger.error(f"Error during API call in doc_operations: {e}")
         return None
 
+@traced("doc.filename")
 def doc_reading(command):
     """
     Extracts the filename with its extension from the given command using Groq API.
@@ -275,12 +271,7 @@ def doc_reading(command):
     ]
 
     try:
-        response = client.chat.completions.create(
-            messages=prompt,
-            model="llama3-70b-8192"
-        )
-        
-        result = response.choices[0].message.content.strip()
+        result = llm.complete(prompt)
         logger.info(f"Extracted filename: {result}")
         return result
     
@@ -288,25 +279,90 @@ def doc_reading(command):
         logger.error(f"Error during API call in doc_reading: {e}")
         return None
 
-def doc_main(command, speech_recog):
+def describe_file(path):
+    """
+    Names a file for speech, e.g. "sunrise dot txt", adding its folder if it is not the current one.
+    """
+    name = os.path.basename(path).replace(".", " dot ")
+    folder = os.path.dirname(os.path.abspath(path))
+    if folder != os.getcwd():
+        name += f" in {os.path.basename(folder) or 'the root folder'}"
+    return name
+
+def resolve_document(command, speech_recog, filename=None):
+    """
+    Works out which document the user means, matching the spoken name against the files in the
+    current and recent folders before asking anyone.
+    
+    A clear match is opened straight away. When several files match about equally, the user is
+    asked to choose. Only when nothing matches is the LLM asked to extract the filename, which
+    may be a new file.
+    
+    Args:
+        command (str): The command that asked for the document.
+        speech_recog (STT): Used to hear the user's choice between similar files.
+        filename (str, optional): A filename already extracted by the planner.
+    
+    Returns:
+        str or None: The document to open, or None if it could not be determined.
+    """
+    if filename and os.path.isfile(filename):
+        return filename
+    
+    resolution = resolve_filename(command, name=filename)
+    if resolution["path"]:
+        resolver_stats["local"] += 1
+        logger.info(f"Resolved '{resolution['name']}' locally to {resolution['path']}")
+        return resolution["path"]
+    
+    candidates = resolution["candidates"]
+    if candidates:
+        resolver_stats["asked"] += 1
+        logger.info(f"'{resolution['name']}' is ambiguous between {candidates}")
+        names = " or ".join(describe_file(path) for path in candidates)
+        if len(candidates) == 1:
+            speak(f"Did you mean {names}?")
+        else:
+            speak(f"Did you mean {names}? Say the first, the second, or the name.")
+        answer = speech_recog.listen()
+        logger.info(f"User choice: {answer}")
+        choice = choose_candidate(answer, candidates)
+        if choice is None:
+            speak("I could not tell which file you meant.")
+        return choice
+    
+    if filename:
+        # The planner named a file that does not exist yet
+        return filename
+    
+    resolver_stats["llm"] += 1
+    filename = doc_reading(command)
+    if filename and not os.path.isfile(filename):
+        filename = resolve_filename(command, name=filename)["path"] or filename
+    return filename
+
+def doc_main(command, speech_recog, filename=None):
     """
     Main function to handle document editing based on user commands.
     
     Args:
         command (str): The initial command to open a document.
         speech_recog (STT): An instance of the STT (Speech-to-Text) class.
+        filename (str, optional): The document to open, if already known. When omitted, or when
+            the file does not exist, it is resolved from the command.
     """
     speak("You are now in document editor mode. Say Exit at the end to close the document after all your changes.")
     logger.info("Entered document editor mode.")
     
-    filename = doc_reading(command)
+    filename = resolve_document(command, speech_recog, filename)
     if not filename:
         speak("Could not extract the filename from your command.")
         logger.error("Filename extraction failed.")
         return
     
     logger.info(f"Filename extracted: {filename}")
-    speak(f"Opening the document {filename}.")
+    remember_directory(os.path.dirname(os.path.abspath(filename)))
+    speak(f"Opening the document {describe_file(filename)}.")
     
     while True:
         document_content = read_docx(filename)
@@ -316,8 +372,7 @@ def doc_main(command, speech_recog):
             speak("Document is now open. What would you like to do?")
         
         # Record audio input from the user
-        speech_recog.record_audio("audio_sample.wav", duration=7)
-        command = speech_recog.process_audio_with_whisper("audio_sample.wav")
+        command = speech_recog.listen()
         logger.info(f"User command: {command}")
         
         if not command:
@@ -341,15 +396,19 @@ def doc_main(command, speech_recog):
             speak(text_to_read)
             logger.info("Read command executed.")
         
+        elif any(keyword in command.lower() for keyword in ["summary", "summarize", "how many", "what is"]):
+            # It's an informational query; speak the answer while it is generated
+            if doc_operations(document_content, command, speak_response=True) is None:
+                speak("Operation failed.")
+                logger.error("Document operation failed.")
+            else:
+                logger.info("Informational operation executed.")
+        
         else:
             updated_content = doc_operations(document_content, command)
             if updated_content is None:
                 speak("Operation failed.")
                 logger.error("Document operation failed.")
-            elif any(keyword in command.lower() for keyword in ["summary", "summarize", "how many", "what is"]):
-                # It's an informational query
-                speak(updated_content)
-                logger.info("Informational operation executed.")
             else:
                 # It's an update operation; write back to the file
                 if filename.lower().endswith(".docx"):
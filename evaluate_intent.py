@@ -0,0 +1,68 @@
+import argparse
+import time
+
+import numpy as np
+
+from intent_classifier import DEFAULT_TRAINING_PATH, IntentClassifier, LABELS, load_examples
+
+
+def evaluate(texts, labels, threshold, folds=5, seed=0):
+    """
+    Cross-validates the classifier and reports how often it could answer without the LLM.
+
+    Args:
+        texts (list): Commands.
+        labels (numpy.ndarray): 0/1 labels indexing LABELS.
+        threshold (float): Minimum confidence for a local answer.
+        folds (int): Number of cross-validation folds.
+
+    Returns:
+        dict: Accuracy, accuracy of the confident answers, fraction of LLM calls avoided and
+        mean prediction time in milliseconds.
+    """
+    order = np.random.default_rng(seed).permutation(len(texts))
+    correct = confident = confident_correct = 0
+    elapsed = 0.0
+
+    for fold in range(folds):
+        test = order[fold::folds]
+        train = np.setdiff1d(order, test)
+        classifier = IntentClassifier().fit([texts[i] for i in train], labels[train])
+        for i in test:
+            started = time.perf_counter()
+            label, confidence = classifier.predict(texts[i])
+            elapsed += time.perf_counter() - started
+            is_correct = label == LABELS[int(labels[i])]
+            correct += is_correct
+            if confidence >= threshold:
+                confident += 1
+                confident_correct += is_correct
+
+    total = len(texts)
+    return {
+        "accuracy": correct / total,
+        "confident_accuracy": confident_correct / confident if confident else float("nan"),
+        "llm_calls_avoided": confident / total,
+        "ms_per_prediction": 1000 * elapsed / total
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local intent classifier.")
+    parser.add_argument("--data", default=DEFAULT_TRAINING_PATH, help="Labeled TSV file")
+    parser.add_argument("--threshold", type=float, nargs="+", default=[0.6, 0.7, 0.8, 0.9],
+                        help="Confidence thresholds to report")
+    parser.add_argument("--folds", type=int, default=5)
+    args = parser.parse_args()
+
+    texts, labels = load_examples(args.data)
+    print(f"{len(texts)} examples, {args.folds}-fold cross-validation")
+    print(f"{'threshold':>9}  {'accuracy':>8}  {'confident acc.':>14}  {'LLM avoided':>11}  {'ms/pred':>7}")
+    for threshold in args.threshold:
+        r = evaluate(texts, labels, threshold, args.folds)
+        print(f"{threshold:>9.2f}  {r['accuracy']:>8.3f}  {r['confident_accuracy']:>14.3f}  "
+              f"{r['llm_calls_avoided']:>11.3f}  {r['ms_per_prediction']:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
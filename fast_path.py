@@ -0,0 +1,161 @@
+import os
+import re
+import shlex
+import time
+
+# Politeness and filler around a command that does not change its meaning
+FILLER_PREFIX = re.compile(r"^(?:(?:ok(?:ay)?|hey|so|now|please|can you|could you|would you|will you|"
+                           r"i want to|i'd like to|i would like to|let's)\s+)+", re.IGNORECASE)
+FILLER_SUFFIX = re.compile(r"(?:\s+(?:please|for me|now))+$", re.IGNORECASE)
+
+FOLDER = r"(?:folder|directory|dir)"
+
+# (kind, pattern) pairs, each matched against the whole normalized transcript. Matching ignores
+# case, but the transcript keeps it, so a captured folder name is used as spoken
+PATTERNS = [
+    ("pwd", re.compile(r"(?:where am i(?: now| right now)?|where are we|"
+                       rf"(?:what|which) {FOLDER} am i in|(?:what is|what's) (?:the |my )?current {FOLDER}|"
+                       rf"(?:show|tell me|say) (?:the |my )?current {FOLDER}|print working directory|pwd)", re.IGNORECASE)),
+    ("ls", re.compile(r"(?:list|show(?: me)?|what are) (?:all )?(?:the |my )?(?:files|contents|everything)"
+                      rf"(?: (?:here|in here|in this {FOLDER}|in the current {FOLDER}))?|"
+                      rf"(?:what is|what's) (?:in )?(?:here|in this {FOLDER}|in the current {FOLDER})|ls", re.IGNORECASE)),
+    ("ls_dir", re.compile(r"(?:list|show(?: me)?) (?:all )?(?:the |my )?(?:files|contents) (?:in|of|inside) "
+                          rf"(?:the |my )?(?P<name>.+?)(?: {FOLDER})?", re.IGNORECASE)),
+    ("cd_up", re.compile(rf"(?:go|move) (?:back|up)(?: (?:a|one) (?:level|{FOLDER}))?|cd \.\.|go to (?:the )?parent {FOLDER}", re.IGNORECASE)),
+    ("cd_home", re.compile(rf"(?:go|take me) (?:to )?(?:my )?home(?: {FOLDER})?", re.IGNORECASE)),
+    ("cd", re.compile(rf"(?:go|move|navigate|switch|change directory) (?:in)?to (?:the |my )?(?P<name>.+?)(?: {FOLDER})?|"
+                      rf"open (?:the |my )?(?P<name2>.+?) {FOLDER}|cd (?P<name3>.+)", re.IGNORECASE)),
+    ("mkdir", re.compile(rf"(?:make|create) (?:a |an )?(?:new )?{FOLDER} (?:called |named )?(?P<name>.+)|mkdir (?P<name2>.+)", re.IGNORECASE)),
+]
+
+# Counters for the match rate and the time spent matching
+stats = {"turns": 0, "matched": 0, "seconds": 0.0}
+
+
+def normalize(transcript, keep_case=False):
+    """
+    Strips punctuation and filler words around a command, and lowercases it unless `keep_case` is set.
+    """
+    text = re.sub(r"\s+", " ", transcript if keep_case else transcript.lower()).strip()
+    text = text.strip(" .?!,")
+    text = FILLER_PREFIX.sub("", text)
+    return FILLER_SUFFIX.sub("", text)
+
+
+def spoken_name(name):
+    """
+    Turns a spoken folder name into a path component, e.g. "my notes dot backup" -> "my notes.backup".
+    """
+    name = re.sub(r"\s*\bdot\b\s*", ".", name.strip(" .?!,\"'"), flags=re.IGNORECASE)
+    return re.sub(r"\s*\b(?:underscore)\b\s*", "_", name, flags=re.IGNORECASE)
+
+
+def find_directory(name, cwd):
+    """
+    Finds a subdirectory of cwd by name, ignoring case and treating spaces, hyphens and
+    underscores alike.
+
+    Returns:
+        str or None: The directory name as it exists on disk, or None if there is no single match.
+    """
+    def key(value):
+        return re.sub(r"[\s_-]+", "", value.lower())
+
+    wanted = key(name)
+    try:
+        with os.scandir(cwd) as entries:
+            matches = [entry.name for entry in entries if entry.is_dir() and key(entry.name) == wanted]
+    except OSError:
+        return None
+    return matches[0] if len(matches) == 1 else None
+
+
+def match_fast_command(transcript, cwd, os_name):
+    """
+    Maps a recurring file-system request straight to a command without asking the LLM.
+
+    Only whole-transcript matches are accepted, and folder names must exist where they are needed,
+    so anything less certain falls through to the LLM.
+
+    Args:
+        transcript (str): The user command.
+        cwd (str): Current working directory.
+        os_name (str): Name of the operating system.
+
+    Returns:
+        dict or None: A plan in the shape plan_command returns, or None if the request is not recognized.
+    """
+    started = time.perf_counter()
+    stats["turns"] += 1
+    plan = None
+    if transcript and os_name != 'Windows':
+        plan = _match(normalize(transcript, keep_case=True), cwd)
+    stats["seconds"] += time.perf_counter() - started
+    if plan:
+        stats["matched"] += 1
+    return plan
+
+
+def _plan(command, needs_verbalization):
+    return {"intent": "Bash command execution", "bash_command": command, "filename": None,
+            "needs_verbalization": needs_verbalization}
+
+
+def _match(text, cwd):
+    for kind, pattern in PATTERNS:
+        match = pattern.fullmatch(text)
+        if not match:
+            continue
+        name = next((value for value in match.groupdict().values() if value), None)
+
+        if kind == "pwd":
+            return _plan("pwd", True)
+        if kind == "ls":
+            return _plan("ls", True)
+        if kind == "cd_up":
+            return _plan("cd ..", True)
+        if kind == "cd_home":
+            return _plan(f"cd {shlex.quote(os.path.expanduser('~'))}", True)
+        if kind == "mkdir":
+            return _plan(f"mkdir {shlex.quote(spoken_name(name))}", False)
+
+        # Listing or entering a folder needs the folder to exist
+        directory = find_directory(spoken_name(name), cwd)
+        if directory is None:
+            continue
+        if kind == "ls_dir":
+            return _plan(f"ls {shlex.quote(directory)}", True)
+        return _plan(f"cd {shlex.quote(directory)}", True)
+    return None
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description="Replay transcripts through the fast-path matcher.")
+    parser.add_argument("transcripts", nargs="*",
+                        help="Text files with one transcript per line, e.g. test/fast_path.txt "
+                             "(default: commands found in logs/*.log)")
+    parser.add_argument("--cwd", default=os.getcwd(), help="Directory folder names are resolved against")
+    args = parser.parse_args()
+
+    rows = []
+    if args.transcripts:
+        for path in args.transcripts:
+            with open(path, "r", encoding="utf-8") as f:
+                rows += [line.strip() for line in f if line.strip()]
+    else:
+        for path in sorted(glob.glob("logs/*.log")):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    match = re.search(r"User command received: (.+)$", line)
+                    if match and match.group(1) != "None":
+                        rows.append(match.group(1).strip())
+
+    for row in rows:
+        plan = match_fast_command(row, args.cwd, os.name)
+        print(f"{plan['bash_command'] if plan else '-':<30} {row}")
+    if stats["turns"]:
+        print(f"\n{stats['matched']}/{stats['turns']} matched ({stats['matched'] / stats['turns']:.1%}), "
+              f"{1000 * stats['seconds'] / stats['turns']:.3f} ms per transcript")
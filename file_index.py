@@ -0,0 +1,497 @@
+import collections
+import ctypes
+import ctypes.util
+import difflib
+import logging
+import math
+import os
+import select
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+
+from tracing import traced
+
+# Create logs directory if it doesn't exist
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+# Generate timestamp for log filename
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(f"logs/blindsight_{timestamp}.log")
+    ]
+)
+
+# Create logger for the specific module
+logger = logging.getLogger(__name__)
+
+# Resolved once at import so a `cd` by execute_command does not move the index
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "file_index.sqlite3")
+
+# Folders that are never indexed: pseudo file systems, and trees nobody asks for by name
+SKIP_PATHS = {"/proc", "/sys", "/dev", "/run"}
+SKIP_NAMES = {"node_modules", "__pycache__", "site-packages", "venv"}
+
+# Ranking: name similarity first, then closeness to the cwd, then how recently the file changed
+PROXIMITY_WEIGHT = 0.2
+RECENCY_WEIGHT = 0.1
+RECENCY_HALF_LIFE = 7 * 86400
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def trigrams(name):
+    """
+    The set of character trigrams of a name without its extension, padded so that its start and
+    end count too.
+    """
+    padded = f" {os.path.splitext(name.lower())[0]} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(query, name):
+    """
+    How alike a query and a name are, from 0 to 1. Names are compared without their extensions,
+    which only count when the query has one ("report" matches "report.docx" fully).
+    """
+    query, name = query.lower(), name.lower()
+    if query == name:
+        return 1.0
+    query_stem, query_extension = os.path.splitext(query)
+    stem, extension = os.path.splitext(name)
+    score = difflib.SequenceMatcher(None, query_stem, stem).ratio()
+    if query_extension:
+        score = 0.85 * score + 0.15 * (query_extension == extension)
+    return score
+
+
+def proximity(path, cwd):
+    """
+    1 for items in the cwd, falling off with every folder up or down between them.
+    """
+    folder = os.path.dirname(path)
+    try:
+        common = os.path.commonpath([folder, cwd])
+    except ValueError:
+        return 0.0
+    depth = lambda p: len([part for part in p.split(os.sep) if part])
+    steps = depth(cwd) - depth(common) + depth(folder) - depth(common)
+    return 1 / (1 + steps)
+
+
+class InotifyWatcher:
+    """
+    Minimal inotify binding through ctypes: one watch per directory, events read without blocking.
+
+    Raises OSError when inotify is not available (non-Linux systems).
+    """
+
+    def __init__(self, max_watches=8192):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.max_watches = max_watches
+        self.paths = {}
+        self.full = False
+
+    def add(self, path):
+        """
+        Watches a directory. Returns False once the watch limit is reached.
+        """
+        if len(self.paths) >= self.max_watches:
+            self.full = True
+            return False
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            # ENOSPC means the kernel's fs.inotify.max_user_watches is used up
+            self.full = self.full or ctypes.get_errno() == 28
+            return False
+        self.paths[wd] = path
+        return True
+
+    def read(self, timeout):
+        """
+        Waits up to `timeout` seconds and returns the pending events as (mask, path) pairs.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            folder = self.paths.get(wd)
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+                continue
+            if folder is None and not mask & IN_Q_OVERFLOW:
+                continue
+            events.append((mask, os.path.join(folder, name) if name else folder))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileIndex:
+    """
+    Trigram inverted index over the names of every file and folder under a set of roots.
+
+    The index is built by a background thread, persisted to SQLite so the next session can answer
+    lookups straight away, and kept current with inotify. Where inotify is unavailable, or the
+    watch limit is reached, the roots are rescanned every `rescan_interval` seconds instead.
+    """
+
+    def __init__(self, roots, path=DEFAULT_INDEX_PATH, max_files=500000, max_watches=8192, rescan_interval=600):
+        self.roots = [os.path.abspath(os.path.expanduser(root)) for root in roots]
+        self.path = path
+        self.max_files = max_files
+        self.max_watches = max_watches
+        self.rescan_interval = rescan_interval
+        self.ids = {}
+        self.paths = []
+        self.names = []
+        self.mtimes = []
+        self.seen = []
+        self.free = []
+        self.postings = collections.defaultdict(set)
+        # Indexed paths by parent folder, so removing a folder only visits what is under it
+        self.children = collections.defaultdict(set)
+        self.ready = threading.Event()
+        self.watcher = None
+        self.db = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._generation = 0
+        self._upserts = {}
+        self._deletes = set()
+
+    @classmethod
+    def from_env(cls):
+        roots = os.getenv("FILE_INDEX_ROOTS", os.path.expanduser("~")).split(os.pathsep)
+        return cls([root for root in roots if root],
+                   path=os.getenv("FILE_INDEX_PATH", DEFAULT_INDEX_PATH),
+                   max_files=int(os.getenv("FILE_INDEX_MAX_FILES", "500000")),
+                   max_watches=int(os.getenv("FILE_INDEX_MAX_WATCHES", "8192")),
+                   rescan_interval=float(os.getenv("FILE_INDEX_RESCAN", "600")))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _add(self, path, mtime):
+        with self._lock:
+            item = self.ids.get(path)
+            if item is not None:
+                self.mtimes[item] = mtime
+                self.seen[item] = self._generation
+                return
+            if len(self.ids) >= self.max_files:
+                return
+            name = os.path.basename(path)
+            if self.free:
+                item = self.free.pop()
+                self.paths[item], self.names[item], self.mtimes[item], self.seen[item] = \
+                    path, name, mtime, self._generation
+            else:
+                item = len(self.paths)
+                self.paths.append(path)
+                self.names.append(name)
+                self.mtimes.append(mtime)
+                self.seen.append(self._generation)
+            self.ids[path] = item
+            self.children[os.path.dirname(path)].add(path)
+            for gram in trigrams(name):
+                self.postings[gram].add(item)
+
+    def _discard(self, item):
+        path = self.paths[item]
+        del self.ids[path]
+        for gram in trigrams(self.names[item]):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(item)
+                if not posting:
+                    del self.postings[gram]
+        parent = os.path.dirname(path)
+        siblings = self.children.get(parent)
+        if siblings is not None:
+            siblings.discard(path)
+            if not siblings:
+                del self.children[parent]
+        self.paths[item] = None
+        self.free.append(item)
+        return path
+
+    def _remove(self, path):
+        """
+        Drops a path and, for a folder, everything under it.
+        """
+        with self._lock:
+            pending = [path.rstrip(os.sep) or path]
+            while pending:
+                current = pending.pop()
+                pending.extend(self.children.get(current, ()))
+                item = self.ids.get(current)
+                if item is not None:
+                    self._deletes.add(self._discard(item))
+
+    def _skipped(self, path, name):
+        return name.startswith(".") or name in SKIP_NAMES or path in SKIP_PATHS
+
+    def _scan(self, top):
+        """
+        Indexes everything under `top`, watching each folder on the way when inotify is in use.
+        """
+        stack = [top]
+        while stack and not self._stop.is_set():
+            folder = stack.pop()
+            if self.watcher is not None:
+                self.watcher.add(folder)
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if self._skipped(entry.path, entry.name):
+                            continue
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            mtime = entry.stat(follow_symlinks=False).st_mtime
+                        except OSError:
+                            continue
+                        self._add(entry.path, mtime)
+                        self._upserts[entry.path] = mtime
+                        if is_dir:
+                            stack.append(entry.path)
+            except OSError:
+                continue
+
+    def _open_db(self):
+        try:
+            self.db = sqlite3.connect(self.path)
+            self.db.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL)")
+            self.db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Could not open the file index at {self.path}: {e}. Keeping it in memory only.")
+            self.db = None
+
+    def _load(self):
+        if self.db is None:
+            return
+        try:
+            for path, mtime in self.db.execute("SELECT path, mtime FROM files"):
+                if any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in self.roots):
+                    self._add(path, mtime)
+        except sqlite3.Error as e:
+            logger.error(f"Could not read the file index: {e}")
+
+    def _flush(self):
+        """
+        Writes the changes since the last flush to SQLite.
+        """
+        with self._lock:
+            upserts, self._upserts = self._upserts, {}
+            deletes, self._deletes = self._deletes, set()
+        if self.db is None or not (upserts or deletes):
+            return
+        try:
+            self.db.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in deletes))
+            self.db.executemany("INSERT OR REPLACE INTO files (path, mtime) VALUES (?, ?)", upserts.items())
+            self.db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"File index write failed: {e}")
+
+    def rescan(self):
+        """
+        Walks the roots again and drops whatever was not found.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        for root in self.roots:
+            if os.path.isdir(root):
+                self._add(root, os.stat(root).st_mtime)
+                self._scan(root)
+        if self._stop.is_set():
+            return
+        with self._lock:
+            stale = [item for item, path in enumerate(self.paths) if path is not None and self.seen[item] < generation]
+            for item in stale:
+                self._deletes.add(self._discard(item))
+        self._flush()
+        self.ready.set()
+        logger.info(f"File index scanned {len(self)} items under {', '.join(self.roots)} "
+                    f"in {time.perf_counter() - started:.2f}s ({len(stale)} removed)")
+        if len(self) >= self.max_files:
+            logger.warning(f"File index is capped at {self.max_files} items; set FILE_INDEX_MAX_FILES to raise it.")
+
+    def _apply(self, mask, path):
+        name = os.path.basename(path)
+        if mask & IN_Q_OVERFLOW:
+            return True
+        if self._skipped(path, name):
+            return False
+        if mask & (IN_DELETE | IN_MOVED_FROM | IN_DELETE_SELF):
+            self._remove(path)
+        elif mask & (IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE):
+            try:
+                mtime = os.stat(path, follow_symlinks=False).st_mtime
+            except OSError:
+                return False
+            self._add(path, mtime)
+            with self._lock:
+                self._upserts[path] = mtime
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._scan(path)
+        return False
+
+    def _run(self):
+        self._open_db()
+        started = time.perf_counter()
+        self._load()
+        if len(self):
+            self.ready.set()
+            logger.info(f"Loaded {len(self)} indexed items in {time.perf_counter() - started:.2f}s")
+
+        try:
+            self.watcher = InotifyWatcher(self.max_watches)
+        except OSError as e:
+            logger.info(f"inotify unavailable ({e}); the file index will be rescanned every {self.rescan_interval:.0f}s")
+        self.rescan()
+        if self.watcher is not None and self.watcher.full:
+            logger.warning(f"inotify watch limit reached after {len(self.watcher.paths)} folders; "
+                           f"falling back to rescans every {self.rescan_interval:.0f}s")
+
+        last_scan = time.monotonic()
+        while not self._stop.is_set():
+            if self.watcher is None or self.watcher.full:
+                if self._stop.wait(1.0):
+                    break
+            else:
+                overflowed = False
+                for mask, path in self.watcher.read(1.0):
+                    overflowed = self._apply(mask, path) or overflowed
+                if overflowed:
+                    logger.warning("inotify queue overflowed; rescanning the file index.")
+                    self.rescan()
+                    last_scan = time.monotonic()
+                self._flush()
+                continue
+            if time.monotonic() - last_scan >= self.rescan_interval:
+                self.rescan()
+                last_scan = time.monotonic()
+
+        self._flush()
+        if self.watcher is not None:
+            self.watcher.close()
+        if self.db is not None:
+            self.db.close()
+
+    def start(self):
+        """
+        Loads the persisted index and keeps it up to date on a background thread.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="file-index", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    @traced("file_index.search")
+    def search(self, query, cwd=None, limit=5, min_similarity=0.7, max_candidates=500):
+        """
+        Finds indexed files and folders whose name resembles `query`.
+
+        The names sharing the most trigrams with the query are scored by similarity, then by how
+        close they are to `cwd` and how recently they changed.
+
+        Returns:
+            list: (score, path) pairs, best first.
+        """
+        query = os.path.basename(query.strip().rstrip(os.sep))
+        if not query:
+            return []
+        query_grams = trigrams(query)
+        cwd = cwd or os.getcwd()
+        now = time.time()
+        with self._lock:
+            counts = collections.Counter()
+            for gram in query_grams:
+                posting = self.postings.get(gram)
+                if posting:
+                    counts.update(posting)
+            candidates = [(self.paths[item], self.names[item], self.mtimes[item])
+                          for item, _ in counts.most_common(max_candidates)]
+
+        results = []
+        for path, name, mtime in candidates:
+            score = similarity(query, name)
+            if score < min_similarity:
+                continue
+            recency = math.pow(0.5, max(now - mtime, 0) / RECENCY_HALF_LIFE)
+            score += PROXIMITY_WEIGHT * proximity(path, cwd) + RECENCY_WEIGHT * recency
+            results.append((score, path))
+        results.sort(reverse=True)
+        return results[:limit]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the filename index and look up names in it.")
+    parser.add_argument("queries", nargs="*", help="Names to look up, e.g. sunrize.txt")
+    parser.add_argument("--cwd", default=os.getcwd(), help="Folder to rank results from")
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    index = FileIndex.from_env()
+    started = time.perf_counter()
+    index.start()
+    index.ready.wait()
+    print(f"{len(index)} items ready after {time.perf_counter() - started:.2f}s")
+    for query in args.queries:
+        started = time.perf_counter()
+        results = index.search(query, cwd=args.cwd, limit=args.limit)
+        print(f"\n{query} ({1000 * (time.perf_counter() - started):.1f} ms)")
+        for score, path in results:
+            print(f"  {score:.2f}  {path}")
+    index.stop()
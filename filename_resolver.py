@@ -0,0 +1,248 @@
+import collections
+import os
+import re
+
+import numpy as np
+
+from fast_path import normalize, spoken_name
+
+# Document types the document reader can open
+SUPPORTED_EXTENSIONS = (".txt", ".docx")
+
+# Spoken extensions, including the ways whisper tends to write them out
+SPOKEN_EXTENSIONS = [
+    (re.compile(r"\s*\bdot (?:txt|text|t x t)\b"), ".txt"),
+    (re.compile(r"\s*\bdot (?:docx|doc x|docs|d o c x)\b"), ".docx"),
+]
+
+# Words that describe the request rather than name the file. "text" and "document" hint at the type
+FILLER_WORDS = {"open", "read", "edit", "load", "show", "me", "up", "the", "my", "a", "an", "this", "that",
+                "file", "document", "doc", "text", "word", "called", "named"}
+TYPE_HINTS = {"text": ".txt", "document": ".docx", "word": ".docx", "doc": ".docx"}
+
+# Soundex-style consonant classes; vowels and h, w, y carry no sound class
+PHONETIC_CLASSES = {letter: str(group) for group, letters in
+                    enumerate(["bfpv", "cgjkqsxz", "dt", "l", "mn", "r"], 1) for letter in letters}
+
+# A candidate is picked without asking when it scores at least CLEAR_SCORE and beats the
+# runner-up by CLEAR_MARGIN. Candidates under MIN_SCORE are not considered at all.
+CLEAR_SCORE = float(os.getenv("FILENAME_CLEAR_SCORE", "0.75"))
+CLEAR_MARGIN = float(os.getenv("FILENAME_CLEAR_MARGIN", "0.1"))
+MIN_SCORE = float(os.getenv("FILENAME_MIN_SCORE", "0.5"))
+
+# Ways to pick an offered candidate by position. Number words are only used when no ordinal is
+# given, so "the second one" means the second
+ORDINALS = {"first": 0, "1": 0, "second": 1, "2": 1, "third": 2, "3": 2, "last": -1}
+NUMBER_WORDS = {"one": 0, "two": 1, "three": 2}
+YES_WORDS = {"yes", "yeah", "yep", "sure", "correct", "right"}
+
+# Folders recently worked in, searched after the cwd
+recent_directories = collections.deque(maxlen=5)
+
+# How often a file was resolved locally, by asking the user, or had to go to the LLM
+stats = {"local": 0, "asked": 0, "llm": 0}
+
+
+def remember_directory(path):
+    """
+    Records a folder the user worked in, so its documents are found from elsewhere too.
+    """
+    path = os.path.abspath(path)
+    if path in recent_directories:
+        recent_directories.remove(path)
+    recent_directories.appendleft(path)
+
+
+def spoken_filename(command):
+    """
+    Pulls the spoken filename out of a command, e.g. "open file sunrize dot txt" -> "sunrize.txt".
+
+    Returns:
+        tuple: (filename, extension hint). The hint comes from words such as "text file" when no
+            extension was spoken, and is None otherwise.
+    """
+    text = normalize(command)
+    for pattern, extension in SPOKEN_EXTENSIONS:
+        text = pattern.sub(extension, text)
+    # "my underscore notes" is joined into one word before the filler words are dropped
+    words = spoken_name(text).split()
+    hint = next((TYPE_HINTS[word] for word in words if word in TYPE_HINTS), None)
+    name = " ".join(word for word in words if word not in FILLER_WORDS)
+    if os.path.splitext(name)[1]:
+        hint = None
+    return name, hint
+
+
+def name_key(name):
+    """
+    The part of a name that is compared: lowercase, without extension, spaces, underscores or hyphens.
+    """
+    return re.sub(r"[\s_.-]+", "", os.path.splitext(name.lower())[0])
+
+
+def phonetic_key(text):
+    """
+    A rough sound-alike key: the first letter, then the consonant classes with repeats collapsed,
+    so "sunrize" and "sunrise" both become "s562". Digits are kept as they are.
+    """
+    key = []
+    last = None
+    for index, char in enumerate(text.lower()):
+        if char.isdigit():
+            key.append(char)
+            last = None
+            continue
+        code = PHONETIC_CLASSES.get(char)
+        if index == 0:
+            key.append(char)
+        elif code is not None and code != last:
+            key.append(code)
+        if char not in "hw":
+            last = code
+    return "".join(key)
+
+
+def edit_similarity(query, candidates):
+    """
+    1 - Levenshtein distance / longer length, for one query against many strings at once.
+
+    The dynamic programme runs one query character at a time over a (candidates x length) matrix.
+    Insertions chain along a row, which is resolved with a running minimum instead of a loop.
+
+    Returns:
+        np.ndarray: One similarity per candidate, from 0 to 1.
+    """
+    count = len(candidates)
+    if count == 0:
+        return np.zeros(0)
+    lengths = np.array([len(candidate) for candidate in candidates])
+    width = max(int(lengths.max()), 1)
+    codes = np.full((count, width), -1, dtype=np.int32)
+    for row, candidate in enumerate(candidates):
+        codes[row, :len(candidate)] = [ord(char) for char in candidate]
+
+    steps = np.arange(width + 1)
+    previous = np.tile(steps, (count, 1))
+    for index, char in enumerate(query, 1):
+        best = np.minimum(previous[:, :-1] + (codes != ord(char)), previous[:, 1:] + 1)
+        current = np.concatenate([np.full((count, 1), index), best], axis=1)
+        previous = np.minimum.accumulate(current - steps, axis=1) + steps
+
+    distance = previous[np.arange(count), lengths]
+    longest = np.maximum(np.maximum(lengths, len(query)), 1)
+    return 1 - distance / longest
+
+
+def score_names(name, names, hint=None):
+    """
+    Scores candidate filenames against a spoken one, combining spelling and sound.
+
+    An extension that was spoken must match; an extension hinted by "text" or "document" only
+    counts a little, since people call any file a document.
+
+    Returns:
+        np.ndarray: One score per name, from 0 to 1.
+    """
+    if not names:
+        return np.zeros(0)
+    query = name_key(name)
+    keys = [name_key(candidate) for candidate in names]
+    scores = 0.6 * edit_similarity(query, keys) + \
+        0.4 * edit_similarity(phonetic_key(query), [phonetic_key(key) for key in keys])
+
+    spoken_extension = os.path.splitext(name)[1].lower()
+    wanted, penalty = (spoken_extension, 0.75) if spoken_extension else (hint, 0.9)
+    if wanted:
+        extensions = np.array([os.path.splitext(candidate)[1].lower() for candidate in names])
+        scores = np.where(extensions == wanted, scores, scores * penalty)
+    return scores
+
+
+def list_documents(directories):
+    """
+    Lists the documents in the given folders, nearest folder first.
+
+    Returns:
+        list: Paths of the supported files, without duplicates.
+    """
+    paths = []
+    seen = set()
+    for directory in directories:
+        if directory in seen:
+            continue
+        seen.add(directory)
+        try:
+            with os.scandir(directory) as entries:
+                paths += sorted(entry.path for entry in entries
+                                if entry.is_file() and entry.name.lower().endswith(SUPPORTED_EXTENSIONS))
+        except OSError:
+            continue
+    return paths
+
+
+def resolve_filename(command, cwd=None, name=None):
+    """
+    Finds the document a command refers to among the files in the cwd and recent folders.
+
+    Args:
+        command (str): The user command, e.g. "open my text file sunrize".
+        cwd (str, optional): The folder searched first. Defaults to the current directory.
+        name (str, optional): A filename already extracted from the command, e.g. by the LLM.
+
+    Returns:
+        dict: "path" is the document when there is a clear winner, and None otherwise.
+            "candidates" lists the plausible paths, best first, when the choice is ambiguous.
+            "name" is the filename as spoken.
+    """
+    cwd = os.path.abspath(cwd or os.getcwd())
+    hint = None
+    if name is None:
+        name, hint = spoken_filename(command)
+    result = {"path": None, "candidates": [], "name": name}
+    if not name_key(name):
+        return result
+
+    paths = list_documents([cwd] + list(recent_directories))
+    names = [os.path.basename(path) for path in paths]
+    exact = [path for path, candidate in zip(paths, names) if candidate.lower() == name.lower()]
+    if exact:
+        result["path"] = exact[0]
+        return result
+
+    scores = score_names(name, names, hint)
+    order = [index for index in np.argsort(-scores, kind="stable") if scores[index] >= MIN_SCORE]
+    if not order:
+        return result
+    best = scores[order[0]]
+    runner_up = scores[order[1]] if len(order) > 1 else 0.0
+    if best >= CLEAR_SCORE and best - runner_up >= CLEAR_MARGIN:
+        result["path"] = paths[order[0]]
+    else:
+        result["candidates"] = [paths[index] for index in order[:3]]
+    return result
+
+
+def choose_candidate(answer, candidates):
+    """
+    Picks one of the offered candidates from the user's answer, by position ("the second one")
+    or by name. A single candidate can also be confirmed with "yes".
+
+    Returns:
+        str or None: The chosen path, or None if the answer does not pick one.
+    """
+    if not answer or not candidates:
+        return None
+    words = normalize(answer).split()
+    if len(candidates) == 1 and YES_WORDS.intersection(words):
+        return candidates[0]
+    for positions in (ORDINALS, NUMBER_WORDS):
+        for word in words:
+            if word in positions and positions[word] < len(candidates):
+                return candidates[positions[word]]
+    name, hint = spoken_filename(answer)
+    scores = score_names(name, [os.path.basename(path) for path in candidates], hint)
+    order = np.argsort(-scores, kind="stable")
+    runner_up = scores[order[1]] if len(order) > 1 else 0.0
+    if scores[order[0]] >= MIN_SCORE and scores[order[0]] - runner_up >= CLEAR_MARGIN:
+        return candidates[order[0]]
+    return None
@@ -0,0 +1,161 @@
+import logging
+import os
+import re
+import sys
+import time
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+# Create logs directory if it doesn't exist
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+# Generate timestamp for log filename
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(f"logs/blindsight_{timestamp}.log")
+    ]
+)
+
+# Create logger for the specific module
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TRAINING_PATH = os.path.join(BASE_DIR, "data", "intent_examples.tsv")
+DEFAULT_MODEL_PATH = os.path.join(BASE_DIR, "data", "intent_model.npz")
+
+# The two labels the LLM intent prompt chooses between
+LABELS = ("Bash command execution", "Document Operation")
+
+
+def load_examples(path=DEFAULT_TRAINING_PATH):
+    """
+    Reads labeled commands from a tab-separated file of "label<TAB>command" lines.
+
+    Returns:
+        tuple: (list of commands, numpy array of 0/1 labels indexing LABELS)
+    """
+    texts, labels = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            label, text = line.rstrip("\n").split("\t", 1)
+            texts.append(text)
+            labels.append(LABELS.index(label))
+    return texts, np.array(labels, dtype=np.float32)
+
+
+def features(text, num_features):
+    """
+    Hashes word unigrams, word bigrams and character trigrams of a command into feature indices.
+
+    Returns:
+        numpy.ndarray: The (possibly repeated) feature indices.
+    """
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    padded = f" {' '.join(words)} "
+    grams += [f"#{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return np.array([zlib.crc32(g.encode()) % num_features for g in grams], dtype=np.int64)
+
+
+class IntentClassifier:
+    """
+    Logistic regression over hashed n-gram features, trained and evaluated in NumPy.
+
+    Predictions take well under a millisecond, so the LLM is only needed when the classifier
+    is not confident.
+    """
+
+    def __init__(self, num_features=2 ** 14):
+        self.num_features = num_features
+        self.weights = np.zeros(num_features, dtype=np.float32)
+        self.bias = 0.0
+
+    def _matrix(self, texts):
+        matrix = np.zeros((len(texts), self.num_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            np.add.at(matrix[row], features(text, self.num_features), 1.0)
+            norm = np.linalg.norm(matrix[row])
+            if norm:
+                matrix[row] /= norm
+        return matrix
+
+    def fit(self, texts, labels, epochs=300, learning_rate=2.0, l2=1e-4):
+        """
+        Trains with full-batch gradient descent on the L2-regularized log loss.
+        """
+        matrix = self._matrix(texts)
+        self.weights = np.zeros(self.num_features, dtype=np.float32)
+        self.bias = 0.0
+        for _ in range(epochs):
+            probabilities = 1.0 / (1.0 + np.exp(-(matrix @ self.weights + self.bias)))
+            error = probabilities - labels
+            self.weights -= learning_rate * (matrix.T @ error / len(texts) + l2 * self.weights)
+            self.bias -= learning_rate * float(error.mean())
+        return self
+
+    def predict_proba(self, text):
+        """
+        Returns the probability that a command is a Document Operation.
+        """
+        indices = features(text, self.num_features)
+        if len(indices) == 0:
+            return 0.5
+        counts = np.bincount(indices)
+        nonzero = np.flatnonzero(counts)
+        values = counts[nonzero] / np.sqrt(np.sum(counts[nonzero] ** 2))
+        score = float(values @ self.weights[nonzero]) + self.bias
+        return 1.0 / (1.0 + np.exp(-score))
+
+    def predict(self, text):
+        """
+        Classifies a command.
+
+        Returns:
+            tuple: (label, confidence) where confidence is the probability of the chosen label.
+        """
+        probability = self.predict_proba(text)
+        if probability >= 0.5:
+            return LABELS[1], probability
+        return LABELS[0], 1.0 - probability
+
+    def save(self, path=DEFAULT_MODEL_PATH):
+        np.savez(path, weights=self.weights, bias=self.bias, num_features=self.num_features)
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH, training_path=DEFAULT_TRAINING_PATH):
+        """
+        Loads the saved model, retraining it first if the training file is newer.
+
+        Returns:
+            IntentClassifier or None: The classifier, or None if there is no training data.
+        """
+        started = time.perf_counter()
+        if os.path.isfile(path) and (not os.path.isfile(training_path)
+                                     or os.path.getmtime(path) >= os.path.getmtime(training_path)):
+            data = np.load(path)
+            classifier = cls(int(data["num_features"]))
+            classifier.weights = data["weights"]
+            classifier.bias = float(data["bias"])
+        elif os.path.isfile(training_path):
+            texts, labels = load_examples(training_path)
+            classifier = cls().fit(texts, labels)
+            try:
+                classifier.save(path)
+            except OSError as e:
+                logger.error(f"Could not save the intent model: {e}")
+        else:
+            logger.info("No intent training data found. Using the LLM for intent recognition.")
+            return None
+        logger.info(f"Intent classifier loaded in {1000 * (time.perf_counter() - started):.1f} ms")
+        return classifier
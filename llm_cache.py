@@ -0,0 +1,169 @@
+import collections
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Create logs directory if it doesn't exist
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+# Generate timestamp for log filename
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(f"logs/blindsight_{timestamp}.log")
+    ]
+)
+
+# Create logger for the specific module
+logger = logging.getLogger(__name__)
+
+# Resolved once at import so a `cd` by execute_command does not move the cache
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3")
+
+
+def normalize_messages(messages):
+    """
+    Normalizes chat messages for use in a cache key.
+
+    Whitespace is collapsed in every message, and trailing sentence punctuation is dropped from
+    user messages, so "List files." and "list files" differ only by case. Case is preserved
+    because filenames in commands and error messages are case-sensitive.
+    """
+    normalized = []
+    for message in messages:
+        content = re.sub(r"\s+", " ", message["content"]).strip()
+        if message["role"] == "user":
+            content = content.rstrip(".!?")
+        normalized.append({"role": message["role"], "content": content})
+    return normalized
+
+
+def cache_key(model, messages, context=None):
+    payload = json.dumps({"model": model, "messages": normalize_messages(messages), "context": context},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-level cache for chat completions: an in-memory LRU in front of a SQLite table.
+
+    Entries expire after `ttl` seconds. The memory level holds at most `memory_size` entries and
+    the disk level at most `max_rows`, evicting the least recently used rows.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_size=256, max_rows=5000, ttl=86400):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.memory = collections.OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.db = None
+        try:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS responses "
+                            "(key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)")
+            self.db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Could not open the LLM response cache at {path}: {e}. Using memory only.")
+            self.db = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                   memory_size=int(os.getenv("LLM_CACHE_SIZE", "256")),
+                   max_rows=int(os.getenv("LLM_CACHE_MAX_ROWS", "5000")),
+                   ttl=float(os.getenv("LLM_CACHE_TTL", "86400")))
+
+    def get(self, key):
+        """
+        Returns the cached value for a key, or None if it is missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if now - created <= self.ttl:
+                    self.memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.memory[key]
+
+            if self.db is not None:
+                try:
+                    row = self.db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+                    if row is not None and now - row[1] <= self.ttl:
+                        self.db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        self.db.commit()
+                        self._remember(key, row[0], row[1])
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return row[0]
+                except sqlite3.Error as e:
+                    logger.error(f"LLM cache read failed: {e}")
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self.db is None:
+                return
+            try:
+                self.db.execute("INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                                (key, value, now, now))
+                self.db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                self.db.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                                "ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self.max_rows,))
+                self.db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"LLM cache write failed: {e}")
+
+    def _remember(self, key, value, created):
+        self.memory[key] = (value, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+_default_cache = None
+
+
+def get_cache():
+    """
+    Returns the process-wide response cache, creating it on first use.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache.from_env()
+    return _default_cache
+
@@ -0,0 +1,462 @@
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_cache import cache_key, get_cache
+from tracing import span
+
+# Create logs directory if it doesn't exist
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+# Generate timestamp for log filename
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(f"logs/blindsight_{timestamp}.log")
+    ]
+)
+
+# Create logger for the specific module
+logger = logging.getLogger(__name__)
+
+# The chat model every call uses unless LLM_MODEL says otherwise
+MODEL = os.getenv("LLM_MODEL", "llama3-70b-8192")
+
+
+class LLMError(Exception):
+    """
+    A chat completion failed. `retryable` is set for rate limits, server errors, timeouts and
+    dropped connections.
+    """
+
+    def __init__(self, message, status=None, retryable=False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+def _is_retryable_status(status):
+    return status == 429 or status >= 500
+
+
+class GroqBackend:
+    """
+    The hosted Groq API. The SDK keeps a pooled keep-alive connection; retries are left to LLMClient.
+    """
+
+    def __init__(self, api_key=None):
+        from groq import Groq
+
+        api_key = api_key or os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY not found in environment variables")
+        self.client = Groq(api_key=api_key, max_retries=0)
+
+    def _create(self, messages, model, timeout, **kwargs):
+        import groq
+
+        try:
+            return self.client.chat.completions.create(messages=messages, model=model, timeout=timeout, **kwargs)
+        except groq.APIStatusError as e:
+            raise LLMError(str(e), e.status_code, _is_retryable_status(e.status_code)) from e
+        except groq.APIConnectionError as e:
+            raise LLMError(str(e), retryable=True) from e
+
+    def complete(self, messages, model, timeout, **kwargs):
+        response = self._create(messages, model, timeout, **kwargs)
+        return response.choices[0].message.content
+
+    def stream(self, messages, model, timeout, **kwargs):
+        response = self._create(messages, model, timeout, stream=True, **kwargs)
+        try:
+            for chunk in response:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        finally:
+            response.close()
+
+
+class OpenAICompatibleBackend:
+    """
+    Any server speaking the OpenAI chat completions API, e.g. llama.cpp, vLLM, Ollama or MockChatServer.
+
+    Each thread keeps its own keep-alive HTTP connection to the server.
+
+    Args:
+        base_url (str): The API root, e.g. "http://127.0.0.1:8080/v1".
+        api_key (str, optional): Sent as a bearer token if given.
+    """
+
+    def __init__(self, base_url, api_key=None):
+        url = urllib.parse.urlsplit(base_url)
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port
+        self.path = url.path.rstrip("/") + "/chat/completions"
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+        self._local = threading.local()
+
+    def _connection(self, timeout):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            connection = connection_class(self.host, self.port, timeout=timeout)
+            self._local.connection = connection
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection
+
+    def _close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _post(self, payload, timeout):
+        try:
+            connection = self._connection(timeout)
+            connection.request("POST", self.path, body=json.dumps(payload).encode("utf-8"), headers=self.headers)
+            response = connection.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            self._close()
+            raise LLMError(f"Request to the LLM server failed: {e}", retryable=True) from e
+        if response.status != 200:
+            body = response.read().decode("utf-8", errors="replace")
+            raise LLMError(f"LLM server returned {response.status}: {body}", response.status,
+                           _is_retryable_status(response.status))
+        return response
+
+    def complete(self, messages, model, timeout, **kwargs):
+        response = self._post({"model": model, "messages": messages, **kwargs}, timeout)
+        try:
+            return json.loads(response.read())["choices"][0]["message"]["content"]
+        except (OSError, http.client.HTTPException) as e:
+            self._close()
+            raise LLMError(f"Reading the LLM response failed: {e}", retryable=True) from e
+
+    def stream(self, messages, model, timeout, **kwargs):
+        response = self._post({"model": model, "messages": messages, "stream": True, **kwargs}, timeout)
+        finished = False
+        try:
+            # Server-sent events: one "data: {...}" line per chunk, ending with "data: [DONE]"
+            for line in response:
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+            response.read()
+            finished = True
+        except (OSError, http.client.HTTPException) as e:
+            raise LLMError(f"LLM stream interrupted: {e}", retryable=True) from e
+        finally:
+            if not finished:
+                # The connection still holds unread data, so it cannot be reused
+                self._close()
+
+
+def default_mock_reply(messages, request):
+    """
+    Canned replies that keep the voice pipeline moving: a plan for `ls` in JSON mode, `ls` for
+    command generation, the bash intent for intent recognition and a short sentence otherwise.
+    """
+    system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+    if request.get("response_format", {}).get("type") == "json_object":
+        return json.dumps({"intent": "Bash command execution", "bash_command": "ls",
+                           "filename": None, "needs_verbalization": True})
+    if "Bash Command Generator" in system:
+        return "ls"
+    if "Identify the intent" in system:
+        return "Bash command execution"
+    return "Here are the files in this folder."
+
+
+class MockChatServer:
+    """
+    In-process OpenAI-compatible chat server for tests and benchmarks without network access.
+
+    Every request waits `latency` seconds before answering. Streamed answers are sent word by
+    word with `token_delay` seconds between words.
+
+    Args:
+        latency (float): Seconds before the first byte of every answer.
+        token_delay (float): Seconds between streamed words.
+        responder (callable, optional): Called with (messages, request) and returns the reply text,
+            or a (text, latency) tuple to override the latency for that request. Defaults to
+            default_mock_reply.
+        port (int): Port to listen on; 0 picks a free one.
+    """
+
+    def __init__(self, latency=0.3, token_delay=0.02, responder=None, port=0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.responder = responder or default_mock_reply
+        self.port = port
+        self.requests = 0
+        self.server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def start(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                mock.requests += 1
+                reply = mock.responder(request.get("messages", []), request)
+                latency = mock.latency
+                if isinstance(reply, tuple):
+                    reply, latency = reply
+                time.sleep(latency)
+
+                if not request.get("stream"):
+                    body = json.dumps({"choices": [{"index": 0, "finish_reason": "stop",
+                                                    "message": {"role": "assistant", "content": reply}}]}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                words = reply.split(" ")
+                try:
+                    for i, word in enumerate(words):
+                        piece = word if i == len(words) - 1 else word + " "
+                        event = json.dumps({"choices": [{"index": 0, "delta": {"content": piece}}]})
+                        self._send_chunk(f"data: {event}\n\n".encode())
+                        time.sleep(mock.token_delay)
+                    self._send_chunk(b"data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client closed the stream early
+                    self.close_connection = True
+
+            def _send_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info(f"Mock LLM server listening on {self.url} (latency {self.latency}s)")
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class LLMClient:
+    """
+    The one chat client the app uses, in front of a pluggable backend.
+
+    Every call has a deadline. Rate limits, server errors and dropped connections are retried with
+    jittered exponential backoff while time remains. Responses go through the response cache.
+
+    Args:
+        backend: GroqBackend, OpenAICompatibleBackend or anything with the same complete/stream methods.
+        model (str): The chat model.
+        timeout (float): Default deadline in seconds for one call, including retries.
+        max_retries (int): Retries after the first attempt.
+        backoff (float): Base delay in seconds before the first retry.
+    """
+
+    def __init__(self, backend, model=MODEL, timeout=15.0, max_retries=3, backoff=0.5):
+        self.backend = backend
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.calls = 0
+        self.retries = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds the client selected by LLM_BACKEND: "groq" (default), "openai" for a local
+        OpenAI-compatible server at LLM_BASE_URL, or "mock" for an in-process MockChatServer
+        with MOCK_LLM_LATENCY seconds of latency.
+        """
+        name = os.getenv("LLM_BACKEND", "groq").lower()
+        if name == "openai":
+            backend = OpenAICompatibleBackend(os.getenv("LLM_BASE_URL", "http://127.0.0.1:8080/v1"),
+                                              os.getenv("LLM_API_KEY"))
+        elif name == "mock":
+            server = MockChatServer(latency=float(os.getenv("MOCK_LLM_LATENCY", "0.3"))).start()
+            backend = OpenAICompatibleBackend(server.url)
+        elif name == "groq":
+            backend = GroqBackend()
+        else:
+            raise ValueError(f"Unknown LLM_BACKEND '{name}'")
+        logger.info(f"LLM backend: {name}, model: {MODEL}")
+        return cls(backend, timeout=float(os.getenv("LLM_TIMEOUT", "15")),
+                   max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")))
+
+    def _retry(self, attempt_call, timeout):
+        deadline = time.monotonic() + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMError("LLM call deadline exceeded", retryable=True)
+            try:
+                return attempt_call(remaining)
+            except LLMError as e:
+                delay = random.uniform(0, self.backoff * 2 ** attempt)
+                if not e.retryable or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.error(f"LLM call failed ({e}), retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+
+    def complete(self, messages, context=None, cache=True, timeout=None, **kwargs):
+        """
+        Runs a chat completion.
+
+        Args:
+            messages (list): Chat messages.
+            context (dict, optional): Extra state the answer depends on, such as cwd or os_name.
+            cache (bool): Set to False for calls that must always reach the model.
+            timeout (float, optional): Deadline in seconds for this call, including retries.
+            **kwargs: Passed through to the backend, e.g. response_format.
+
+        Returns:
+            str: The stripped message content.
+        """
+        with span("llm.complete", model=self.model) as s:
+            use_cache = cache and os.getenv("LLM_CACHE", "1") == "1"
+            if use_cache:
+                key = cache_key(self.model, messages, {"context": context, "options": kwargs})
+                cached = get_cache().get(key)
+                if cached is not None:
+                    logger.info("LLM response served from cache.")
+                    s.set(cached=True)
+                    return cached
+
+            self.calls += 1
+            retries = self.retries
+            content = self._retry(lambda remaining: self.backend.complete(messages, self.model, remaining, **kwargs),
+                                  timeout).strip()
+            s.set(cached=False, retries=self.retries - retries)
+
+            if use_cache:
+                get_cache().put(key, content)
+            return content
+
+    def stream(self, messages, context=None, cache=True, timeout=None, **kwargs):
+        """
+        Like complete, but yields the content in pieces as the model generates it.
+
+        Only opening the stream is retried; once text has been yielded a failure is raised. A cache
+        hit yields the whole cached answer at once, and only complete answers are cached.
+
+        Yields:
+            str: Pieces of the message content.
+        """
+        with span("llm.stream", model=self.model) as s:
+            use_cache = cache and os.getenv("LLM_CACHE", "1") == "1"
+            if use_cache:
+                key = cache_key(self.model, messages, {"context": context, "options": kwargs})
+                cached = get_cache().get(key)
+                if cached is not None:
+                    logger.info("LLM response served from cache.")
+                    s.set(cached=True)
+                    yield cached
+                    return
+
+            self.calls += 1
+            started = time.monotonic()
+
+            def open_stream(remaining):
+                pieces = self.backend.stream(messages, self.model, remaining, **kwargs)
+                return pieces, next(pieces, None)
+
+            pieces, first = self._retry(open_stream, timeout)
+            s.set(cached=False, first_token=time.monotonic() - started)
+            received = []
+            try:
+                if first is not None:
+                    received.append(first)
+                    yield first
+                for piece in pieces:
+                    received.append(piece)
+                    yield piece
+            finally:
+                pieces.close()
+
+            if use_cache:
+                get_cache().put(key, "".join(received).strip())
+
+
+_default_client = None
+
+
+def get_client():
+    """
+    Returns the process-wide LLM client, creating it on first use.
+    """
+    global _default_client
+    if _default_client is None:
+        _default_client = LLMClient.from_env()
+    return _default_client
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure LLM round-trip latency through the shared client.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--prompt", default="List the files in this folder.")
+    args = parser.parse_args()
+
+    client = get_client()
+    messages = [{"role": "user", "content": args.prompt}]
+    for run in range(args.runs):
+        started = time.perf_counter()
+        first = None
+        for piece in client.stream(messages, cache=False):
+            if first is None:
+                first = time.perf_counter() - started
+        print(f"run {run + 1}: first token {first or 0:.3f}s, total {time.perf_counter() - started:.3f}s")
+    print(f"retries: {client.retries}")
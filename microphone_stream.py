@@ -0,0 +1,158 @@
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import sounddevice as sd
+
+# Create logs directory if it doesn't exist
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+# Generate timestamp for log filename
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(f"logs/blindsight_{timestamp}.log")
+    ]
+)
+
+# Create logger for the specific module
+logger = logging.getLogger(__name__)
+
+
+class MicrophoneStream:
+    """
+    Keeps one input stream open for the whole session and writes it into a fixed-size ring buffer.
+
+    Positions are absolute sample counts since the stream was first opened, so readers can ask for
+    audio from before their request (pre-roll) as long as it is still in the buffer. If the device
+    fails, a watchdog thread reopens the stream.
+    """
+
+    def __init__(self, device, samplerate=16000, capacity_seconds=30, blocksize=480):
+        self.device = device
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.capacity = int(capacity_seconds * samplerate)
+        self.buffer = np.zeros(self.capacity, dtype=np.int16)
+        self.written = 0
+        self.reopens = 0
+        self.stream = None
+        self._data_ready = threading.Condition()
+        self._closed = threading.Event()
+        self._watchdog = None
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            logger.info(f"Input stream status: {status}")
+
+        # Copy into the preallocated ring, wrapping around at most once
+        start = self.written % self.capacity
+        first = min(frames, self.capacity - start)
+        self.buffer[start:start + first] = indata[:first, 0]
+        if first < frames:
+            self.buffer[:frames - first] = indata[first:frames, 0]
+
+        with self._data_ready:
+            self.written += frames
+            self._data_ready.notify_all()
+
+    def _open(self):
+        self.stream = sd.InputStream(device=self.device, samplerate=self.samplerate, channels=1,
+                                     dtype='int16', blocksize=self.blocksize, callback=self._callback)
+        self.stream.start()
+        logger.info(f"Microphone stream opened on device {self.device}.")
+
+    def start(self):
+        """
+        Opens the stream and starts the watchdog that reopens it after device errors.
+        """
+        self._open()
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._supervise, daemon=True)
+            self._watchdog.start()
+
+    def _supervise(self):
+        delay = 0.5
+        while not self._closed.wait(delay):
+            if self.stream is not None and self.stream.active:
+                delay = 0.5
+                continue
+            logger.error("Microphone stream stopped. Reopening.")
+            try:
+                if self.stream is not None:
+                    self.stream.close()
+                self._open()
+                self.reopens += 1
+                delay = 0.5
+            except Exception as e:
+                logger.error(f"Failed to reopen the microphone stream: {e}")
+                delay = min(delay * 2, 5.0)
+
+    @property
+    def position(self):
+        """
+        Absolute sample position of the next sample to be written.
+        """
+        return self.written
+
+    @property
+    def oldest(self):
+        """
+        Absolute sample position of the oldest sample still held in the ring.
+        """
+        return max(0, self.written - self.capacity)
+
+    def wait_for(self, position, timeout=None):
+        """
+        Blocks until the stream has written up to `position`.
+
+        Returns:
+            bool: True if the position was reached, False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._data_ready:
+            while self.written < position:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                # Wake up periodically so a reopened stream is picked up
+                self._data_ready.wait(0.5 if remaining is None else min(remaining, 0.5))
+        return True
+
+    def read(self, start, end):
+        """
+        Copies the samples between two absolute positions out of the ring.
+
+        Args:
+            start (int): First position, clamped to the oldest sample still available.
+            end (int): Position after the last sample, clamped to what has been written.
+
+        Returns:
+            numpy.ndarray: The int16 samples.
+        """
+        start = max(start, self.oldest)
+        end = min(end, self.written)
+        if end <= start:
+            return np.zeros(0, dtype=np.int16)
+
+        first = start % self.capacity
+        last = end % self.capacity
+        if first < last:
+            return self.buffer[first:last].copy()
+        return np.concatenate((self.buffer[first:], self.buffer[:last]))
+
+    def close(self):
+        self._closed.set()
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
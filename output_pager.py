@@ -0,0 +1,266 @@
+import collections
+import os
+import re
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+from verbalizer import spoken_list, spoken_path
+
+# Requests for the next page of a long output
+MORE_REQUEST = re.compile(r"(?:say |read |tell me |show me |give me )?(?:more|next|next page|the next (?:ones|page)|"
+                          r"keep going|continue)(?: please)?")
+
+
+# Requests to stop a command that is still running, heard anywhere in the transcript
+STOP_REQUEST = re.compile(r"\b(?:stop|cancel|abort|enough|never ?mind)\b")
+
+# Commands whose output lines are matches
+SEARCH_COMMANDS = ("find", "grep", "egrep", "rg", "locate", "fd", "dir")
+
+
+def is_more_request(transcript):
+    return bool(transcript) and bool(MORE_REQUEST.fullmatch(transcript.lower().strip(" .?!,")))
+
+
+def is_stop_request(transcript):
+    return bool(transcript) and bool(STOP_REQUEST.search(transcript.lower()))
+
+
+class CapturedOutput:
+    """
+    The stdout of one command, captured line by line as it is produced.
+
+    The first `max_lines` lines (at most `max_bytes`) are kept in memory; everything after that
+    is spilled to a temporary file so it can be paged through without re-running the command.
+    Counts by file extension and by folder are kept for a compact summary. `stopped` is "timeout"
+    or "cancelled" when the command was stopped before it finished.
+    """
+
+    def __init__(self, max_lines=40, max_bytes=8192):
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.head = []
+        self.head_bytes = 0
+        self.total_lines = 0
+        self.total_bytes = 0
+        self.spill = None
+        self.truncated = False
+        self.stopped = None
+        self.extensions = collections.Counter()
+        self.folders = collections.Counter()
+
+    @property
+    def overflowed(self):
+        return self.spill is not None
+
+    def feed(self, line):
+        size = len(line) + 1
+        self.total_lines += 1
+        self.total_bytes += size
+        extension = os.path.splitext(os.path.basename(line))[1].lower()
+        if extension and " " not in extension:
+            self.extensions[extension] += 1
+        folder = os.path.dirname(line)
+        if folder and (folder in self.folders or len(self.folders) < 10000):
+            self.folders[folder] += 1
+
+        if self.spill is None and len(self.head) < self.max_lines and self.head_bytes + size <= self.max_bytes:
+            self.head.append(line)
+            self.head_bytes += size
+            return
+        if self.spill is None:
+            self.spill = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+        self.spill.write(line + "\n")
+
+    def text(self):
+        """
+        Returns the lines kept in memory.
+        """
+        return "\n".join(self.head)
+
+    def lines(self):
+        """
+        Yields every captured line, reading the spilled part back from disk.
+        """
+        yield from self.head
+        if self.spill is not None:
+            self.spill.flush()
+            self.spill.seek(0)
+            for line in self.spill:
+                yield line.rstrip("\n")
+
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
+
+def terminate(process):
+    """
+    Stops a command started by capture_command, with everything it started.
+    """
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGTERM)
+        else:
+            process.terminate()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def capture_command(command, max_lines=40, max_bytes=8192, spill_limit=50 * 1024 * 1024, timeout=None,
+                    cancel=None, output=None):
+    """
+    Runs a shell command, streaming its stdout into a CapturedOutput.
+
+    A command whose output passes `spill_limit` bytes is terminated and the output marked truncated.
+    One that outlives `timeout` seconds, or is cancelled through the `cancel` event, is terminated
+    with output.stopped set, keeping the output so far.
+
+    Returns:
+        tuple: (CapturedOutput, stderr text capped at `max_bytes`, exit code)
+    """
+    # In its own process group, so stopping it also stops what the shell started
+    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               text=True, errors="replace", start_new_session=os.name == "posix")
+    stderr = []
+    if output is None:
+        output = CapturedOutput(max_lines, max_bytes)
+    finished = threading.Event()
+
+    def watch():
+        deadline = time.monotonic() + timeout if timeout else None
+        while not finished.wait(0.2):
+            if cancel is not None and cancel.is_set():
+                output.stopped = "cancelled"
+            elif deadline is not None and time.monotonic() >= deadline:
+                output.stopped = "timeout"
+            if output.stopped:
+                terminate(process)
+                return
+
+    if timeout or cancel is not None:
+        threading.Thread(target=watch, daemon=True).start()
+
+    def read_stderr():
+        stderr.append(process.stderr.read(max_bytes))
+        # Keep draining so the command never blocks on a full pipe
+        while process.stderr.read(65536):
+            pass
+
+    reader = threading.Thread(target=read_stderr, daemon=True)
+    reader.start()
+
+    for line in process.stdout:
+        output.feed(line.rstrip("\n"))
+        if output.total_bytes > spill_limit:
+            output.truncated = True
+            terminate(process)
+            break
+    process.stdout.close()
+    returncode = process.wait()
+    finished.set()
+    reader.join()
+    return output, "".join(stderr), returncode
+
+
+
+def progress_message(command, output):
+    """
+    A short spoken update on a command that is still running, e.g. "Still searching, 120 matches so far."
+    """
+    try:
+        program = os.path.basename(command.split()[0])
+    except IndexError:
+        program = ""
+    searching = program in SEARCH_COMMANDS
+    lines = output.total_lines
+    if not lines:
+        return "Still searching, nothing found yet." if searching else "Still working."
+    if searching:
+        return f"Still searching, {lines} {'match' if lines == 1 else 'matches'} so far."
+    return f"Still working, {lines} {'line' if lines == 1 else 'lines'} of output so far."
+
+
+class Pager:
+    """
+    Reads a long output aloud a page at a time. The position is kept between turns, so "more"
+    continues where the last page stopped.
+    """
+
+    def __init__(self, output, page_size=10):
+        self.output = output
+        self.page_size = page_size
+        self.position = 0
+        self._lines = output.lines()
+        self.announced = False
+        # Paths are read relative to the folder they all share
+        self.prefix = None
+        if output.folders and all(os.path.isabs(folder) for folder in output.folders):
+            self.prefix = os.path.commonpath(list(output.folders))
+
+    def _spoken(self, line):
+        if self.prefix and line.startswith(self.prefix):
+            line = os.path.relpath(line, self.prefix)
+        return spoken_path(line) if os.sep in line else line
+
+    def _folder_counts(self):
+        counts = collections.Counter()
+        for folder, count in self.output.folders.items():
+            if self.prefix:
+                folder = os.path.relpath(folder, self.prefix)
+            top = os.path.normpath(folder).split(os.sep)[0]
+            if top not in ("", "."):
+                counts[top] += count
+        return counts
+
+    def _next_lines(self):
+        page = []
+        for line in self._lines:
+            page.append(line)
+            if len(page) == self.page_size:
+                break
+        self.position += len(page)
+        return page
+
+    def _hint(self):
+        if self.position >= self.output.total_lines:
+            return "That is everything."
+        return f"Say more for the next {self.page_size}."
+
+    def summary(self):
+        """
+        Describes the whole output and reads the first page.
+        """
+        self.announced = True
+        output = self.output
+        total = f"more than {output.total_lines}" if output.truncated else str(output.total_lines)
+        sentences = [f"The command printed {total} lines."]
+        if output.extensions and sum(output.extensions.values()) >= output.total_lines / 2:
+            common = [f"{count} {extension} files" for extension, count in output.extensions.most_common(3)]
+            sentences.append(f"Most common are {spoken_list(common, 3)}.")
+        if self.prefix and self.prefix != os.sep:
+            sentences.append(f"They are all in {spoken_path(self.prefix)}.")
+        folders = self._folder_counts()
+        if folders:
+            common = [f"'{folder}' with {count}" for folder, count in folders.most_common(3)]
+            sentences.append(f"The largest folders are {spoken_list(common, 3)}.")
+        page = [self._spoken(line) for line in self._next_lines()]
+        sentences.append(f"The first {len(page)} are: {', '.join(page)}.")
+        sentences.append(self._hint())
+        return " ".join(sentences)
+
+    def next_page(self):
+        """
+        Reads the next page of the output.
+        """
+        page = [self._spoken(line) for line in self._next_lines()]
+        if not page:
+            return "There is nothing more to read."
+        return f"{', '.join(page)}. {self._hint()}"
+
+    def close(self):
+        self.output.close()
@@ -1,12 +1,29 @@
 import os
+import json
+import shlex
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import logging
 from dotenv import load_dotenv
-from groq import Groq
+from pynput import keyboard
 from STT import STT
-from TTS import speak
+from TTS import speak, speak_stream
 from documentreader import doc_main
+from fast_path import match_fast_command, stats as fast_path_stats
+from verbalizer import verbalize, stats as verbalizer_stats
+from output_pager import CapturedOutput, Pager, capture_command, is_more_request, is_stop_request, progress_message
+from file_index import FileIndex
+from shell_session import ShellSession
+from filename_resolver import remember_directory, stats as resolver_stats
+import tracing
+from tracing import traced
+from intent_classifier import IntentClassifier
+from llm_cache import get_cache
+from llm_client import get_client
+from semantic_cache import CommandCache, SemanticCache, SentenceEmbedder
 import logging
 import sys
 import os
@@ -40,30 +57,12 @@ logger.info(f"Logging initialized for {__name__}")
 load_dotenv()
 
 
-# Initialize Speech-to-Text (STT) system
+# Initialize the shared LLM client (Groq unless LLM_BACKEND says otherwise)
 try:
-    speech_recog = STT()
-    logger.info("Speech-to-Text system initialized.")
-except ImportError as e:
-    logger.error(f"Failed to import STT class: {e}")
-    speak("Speech recognition system is not available.")
-    sys.exit(1)
-except Exception as e:
-    logger.error(f"Error initializing STT system: {e}")
-    speak("An error occurred while initializing the speech recognition system.")
-    sys.exit(1)
-
-
-
-# Initialize Groq client
-try:
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        raise ValueError("GROQ_API_KEY not found in environment variables")
-    client = Groq(api_key=api_key)
-    logger.info("Groq client initialized successfully.")
+    llm = get_client()
+    logger.info("LLM client initialized successfully.")
 except Exception as e:
-    logger.error(f"Failed to initialize Groq client: {e}")
+    logger.error(f"Failed to initialize LLM client: {e}")
     speak("Failed to initialize the language model. Please check your API key and try again.")
     sys.exit(1)
 
@@ -79,9 +78,44 @@ else:
 
 logger.info(f"OS Name set to: {os_name}")
 
+# Local intent classifier; the LLM is only asked when it is not confident enough
+intent_classifier = IntentClassifier.load()
+INTENT_CONFIDENCE = float(os.getenv("INTENT_CONFIDENCE", "0.8"))
+
+
+@traced("intent.local")
+def classify_intent_locally(command):
+    """
+    Identifies the intent of a command with the on-box classifier.
+    
+    Args:
+        command (str): The user command to analyze.
+    
+    Returns:
+        str or None: The intent label, or None if the classifier is unavailable or not confident.
+    """
+    if intent_classifier is None:
+        return None
+    label, confidence = intent_classifier.predict(command)
+    if confidence < INTENT_CONFIDENCE:
+        logger.info(f"Local intent '{label}' below confidence threshold ({confidence:.2f}).")
+        return None
+    logger.info(f"Intent recognized locally: {label} ({confidence:.2f})")
+    return label
+
+
+# Reuse the intent of commands that mean the same thing as an earlier one, e.g. "show me my
+# files" after "list the files". A shell command is only reused when the same words ask for it,
+# so a similar sounding request never replays a different action. The embedding model loads in
+# the background once main() starts.
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "1") == "1"
+semantic_embedder = SentenceEmbedder()
+intent_semantic_cache = SemanticCache("intent", semantic_embedder)
+bash_command_cache = CommandCache("bash")
 
 
 # Intent recognition using LLM
+@traced("intent.llm")
 def recognize_intent_with_llm(command):
     """
     Identifies the intent of a given command using the Groq LLM.
@@ -92,6 +126,10 @@ def recognize_intent_with_llm(command):
     Returns:
         str: The identified intent label ("Bash command execution" or "Document Operation").
     """    
+    intent_label = classify_intent_locally(command)
+    if intent_label:
+        return intent_label
+
     prompt = [
     {
         "role": "system",
@@ -162,14 +200,16 @@ Respond only with the intent label and nothing else.
     }
 ]
         
+    if SEMANTIC_CACHE:
+        intent_label = intent_semantic_cache.lookup(command)
+        if intent_label:
+            return intent_label
+
     try:
-        response = client.chat.completions.create(
-            messages=prompt,
-            model="llama3-70b-8192"
-        )
-        # Extract and return the intent label
-        intent_label = response.choices[0].message.content.strip()
+        intent_label = llm.complete(prompt)
         logger.info(f"Intent recognized: {intent_label}")
+        if SEMANTIC_CACHE:
+            intent_semantic_cache.add(command, intent_label)
         return intent_label
     except Exception as e:
         logger.error(f"Error during intent recognition: {e}")
@@ -185,6 +225,96 @@ Respond only with the intent label and nothing else.
     # bash_command = response.choices[0].message.content
     # return bash_command
 
+# Expected shape of the structured plan returned by plan_command
+PLAN_SCHEMA = {
+    "intent": str,
+    "bash_command": (str, type(None)),
+    "filename": (str, type(None)),
+    "needs_verbalization": bool
+}
+INTENT_LABELS = ("Bash command execution", "Document Operation")
+
+
+def validate_plan(plan):
+    """
+    Checks a parsed plan against PLAN_SCHEMA.
+    
+    Args:
+        plan (dict): The parsed JSON returned by the LLM.
+    
+    Raises:
+        ValueError: If a field is missing, has the wrong type, or the plan is inconsistent.
+    """
+    if not isinstance(plan, dict):
+        raise ValueError("Plan is not a JSON object.")
+    for field, expected_type in PLAN_SCHEMA.items():
+        if field not in plan:
+            raise ValueError(f"Plan is missing '{field}'.")
+        if not isinstance(plan[field], expected_type):
+            raise ValueError(f"Plan field '{field}' has the wrong type.")
+    if plan["intent"] not in INTENT_LABELS:
+        raise ValueError(f"Unknown intent '{plan['intent']}'.")
+    if plan["intent"] == "Bash command execution" and not plan["bash_command"]:
+        raise ValueError("Bash plan has no command.")
+    if plan["intent"] == "Document Operation" and not plan["filename"]:
+        raise ValueError("Document plan has no filename.")
+
+
+@traced("plan")
+def plan_command(command, cwd, os_name):
+    """
+    Plans a spoken command with a single Groq LLM call.
+    
+    The model returns the intent together with either the bash command or the document filename,
+    and whether the command output needs to be rephrased for speech. This replaces the separate
+    intent, command generation and filename extraction round trips.
+    
+    Args:
+        command (str): The user command to plan.
+        cwd (str): Current working directory.
+        os_name (str): Name of the operating system.
+    
+    Returns:
+        dict or None: The validated plan, or None if the response could not be parsed, in which
+        case the caller falls back to the per-step functions.
+    """
+    messages = [
+        {
+            "role": "system",
+            "content": f'''
+You plan voice commands for a file system assistant on {os_name}. The current working directory is {cwd}.
+Respond with a JSON object with exactly these keys:
+
+"intent": "Document Operation" or "Bash command execution".
+    CRUD operations such as Read and Update are Document Operation.
+    File-level actions such as Delete or Rename are Bash command execution.
+"bash_command": for Bash command execution, only the bash command for {os_name}, with paths relative
+    to the current working directory and not starting from ~ or any assumed root unless explicitly
+    requested. Otherwise null.
+"filename": for Document Operation, the filename with its extension, or the full path if one is given
+    (e.g. "Open my text file food" -> "food.txt", "open file sunrize dot txt" -> "sunrize.txt",
+    "Open my document money" -> "money.docx"). Otherwise null.
+"needs_verbalization": true if the command output has to be rephrased to be read aloud (listings,
+    paths, search results), false if it is empty or already a short sentence.
+
+Respond only with the JSON object.
+'''
+        },
+        {"role": "user", "content": command}
+    ]
+
+    try:
+        plan = json.loads(llm.complete(messages, context={"cwd": cwd, "os_name": os_name},
+                                       response_format={"type": "json_object"}))
+        validate_plan(plan)
+        logger.info(f"Command plan: {plan}")
+        return plan
+    except Exception as e:
+        logger.error(f"Error during command planning, falling back to separate calls: {e}")
+        return None
+
+
+@traced("generate_bash")
 def generate_bash_command(request,cwd,os_name):
     """
     Generates a bash command based on the user request using the Groq LLM.
@@ -216,14 +346,18 @@ Guidelines:
         {"role": "user", "content": request}  
     ]
     
+    # The same request can mean a different command in another directory
+    context = {"cwd": cwd, "os_name": os_name}
+    if SEMANTIC_CACHE:
+        bash_command = bash_command_cache.lookup(request, context)
+        if bash_command:
+            return bash_command
+
     try:
-        response = client.chat.completions.create(
-            messages=messages,
-            model="llama3-70b-8192"
-        )
-        # Extract and return the bash command
-        bash_command = response.choices[0].message.content.strip()
+        bash_command = llm.complete(messages, context=context)
         logger.info(f"Bash command generated: {bash_command}")
+        if SEMANTIC_CACHE:
+            bash_command_cache.add(request, bash_command, context)
         return bash_command
     except Exception as e:
         logger.error(f"Error during bash command generation: {e}")
@@ -231,36 +365,205 @@ Guidelines:
         return None
 
 
-def execute_command(command):
+# Output past these limits is summarized and read out a page at a time
+OUTPUT_MAX_LINES = int(os.getenv("OUTPUT_MAX_LINES", "40"))
+OUTPUT_MAX_BYTES = int(os.getenv("OUTPUT_MAX_BYTES", "8192"))
+OUTPUT_SPILL_LIMIT = int(os.getenv("OUTPUT_SPILL_LIMIT", str(50 * 1024 * 1024)))
+OUTPUT_PAGE_SIZE = int(os.getenv("OUTPUT_PAGE_SIZE", "10"))
+
+# Cursor into the last long output, so "more" reads on without re-running the command
+output_pager = None
+
+# Commands run in one long-lived shell, so cd and export carry over between them. Windows, or
+# PERSISTENT_SHELL=0, starts a new shell per command instead
+PERSISTENT_SHELL = os.getenv("PERSISTENT_SHELL", "1") == "1" and os_name != 'Windows'
+COMMAND_TIMEOUT = float(os.getenv("COMMAND_TIMEOUT", "60"))
+shell = ShellSession() if PERSISTENT_SHELL else None
+
+# A command still running after PROGRESS_DELAY seconds can be stopped with a key press or by saying
+# "stop", and reports its progress every PROGRESS_INTERVAL seconds
+PROGRESS_DELAY = float(os.getenv("PROGRESS_DELAY", "3"))
+PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", "10"))
+
+# The recognizer main() listens with, so a running command can be stopped by voice
+active_speech_recog = None
+
+# Why the last command was stopped early ("timeout" or "cancelled"), or None if it finished
+last_command_stopped = None
+
+
+def listen_for_stop(cancel, finished, speaking, spoke):
+    """
+    Transcribes what the user says while a command runs, and cancels it on "stop" or "cancel".
+
+    Nothing is listened to while the assistant speaks (`speaking` is set), and an utterance is
+    dropped if the assistant started speaking while it was recorded (`spoke` was set), so the
+    assistant's own "say stop to cancel" does not stop the command.
+    """
+    speech_recog = active_speech_recog
+    if speech_recog is None or not getattr(speech_recog, "microphone", None):
+        return
+    while not finished.is_set() and not cancel.is_set():
+        spoke.clear()
+        while speaking.is_set() and not finished.is_set():
+            finished.wait(0.1)
+        heard = speech_recog.listen_until(finished)
+        if finished.is_set():
+            break
+        if spoke.is_set():
+            logger.info(f"Ignored what was heard while the assistant spoke: {heard}")
+            continue
+        if is_stop_request(heard):
+            logger.info(f"Stop requested by voice: {heard}")
+            cancel.set()
+
+
+def watch_command(worker, command, output, cancel):
+    """
+    Waits for a command running on `worker`. Once it has run for PROGRESS_DELAY seconds, tells the
+    user how to stop it, listens for a key press or a spoken "stop", and gives a short progress
+    update every PROGRESS_INTERVAL seconds until it finishes.
+    """
+    worker.join(PROGRESS_DELAY)
+    if not worker.is_alive():
+        return
+
+    finished = threading.Event()
+    speaking = threading.Event()
+    spoke = threading.Event()
+
+    def announce(text):
+        spoke.set()
+        speaking.set()
+        try:
+            speak(text)
+        finally:
+            speaking.clear()
+
+    try:
+        listener = keyboard.Listener(on_press=lambda key: cancel.set())
+        listener.start()
+    except Exception as e:
+        logger.error(f"Keyboard listener unavailable, the command can only be stopped by voice: {e}")
+        listener = None
+
+    announce("This is taking a while. Press any key or say stop to cancel.")
+    # Only listen once the prompt is over, so its "say stop" is not taken as a request
+    voice = threading.Thread(target=listen_for_stop, args=(cancel, finished, speaking, spoke), daemon=True)
+    voice.start()
+    while worker.is_alive():
+        worker.join(PROGRESS_INTERVAL)
+        if worker.is_alive() and not cancel.is_set():
+            update = progress_message(command, output)
+            logger.info(f"Progress: {update}")
+            announce(update)
+
+    finished.set()
+    if listener is not None:
+        listener.stop()
+    # The recognizer is needed again for the next command. listen_until returns once `finished` is
+    # set, at worst after transcribing an utterance that had already ended
+    voice.join()
+
+
+def run_captured(command, timeout=None, announce_progress=True):
+    """
+    Runs a shell command with bounded output capture.
+    
+    Only the first OUTPUT_MAX_LINES lines are returned; when there are more, the whole output is
+    kept in output_pager for a spoken summary and pagination. A command stopped by its timeout or
+    by the user returns the output it had produced, and last_command_stopped says why.
+    
+    Args:
+        command (str): The command to run.
+        timeout (float, optional): Seconds after which the command is stopped.
+        announce_progress (bool): Let the user follow and cancel a long command. Off when running
+            in a worker thread.
+    
+    Returns:
+        tuple: (stdout text, stderr text, exit code)
+    """
+    global output_pager, last_command_stopped
+    if output_pager is not None:
+        output_pager.close()
+        output_pager = None
+    
+    output = CapturedOutput(OUTPUT_MAX_LINES, OUTPUT_MAX_BYTES)
+    cancel = threading.Event()
+    result = []
+    
+    def run():
+        if shell is not None:
+            result.append(shell.run(command, timeout, spill_limit=OUTPUT_SPILL_LIMIT, cancel=cancel, output=output))
+        else:
+            result.append(capture_command(command, spill_limit=OUTPUT_SPILL_LIMIT, timeout=timeout,
+                                          cancel=cancel, output=output))
+    
+    # The command runs on its own thread so the user can hear its progress and stop it
+    worker = threading.Thread(target=run, name="command", daemon=True)
+    worker.start()
+    if announce_progress:
+        watch_command(worker, command, output, cancel)
+    worker.join()
+    if not result:
+        raise RuntimeError(f"Command '{command}' did not run.")
+    output, stderr, returncode = result[0]
+    
+    if announce_progress:
+        last_command_stopped = output.stopped
+    if output.stopped:
+        logger.info(f"Command stopped ({output.stopped}) after {output.total_lines} lines of output.")
+    if output.overflowed or output.truncated:
+        logger.info(f"Command printed {output.total_lines} lines ({output.total_bytes} bytes); paginating.")
+        output_pager = Pager(output, OUTPUT_PAGE_SIZE)
+    else:
+        output.close()
+    return output.text().strip(), stderr, returncode
+
+
+@traced("execute_command")
+def execute_command(command, timeout=COMMAND_TIMEOUT, announce_progress=True):
     """
     Executes a given bash command and returns its output.
     
     Args:
         command (str): The bash command to execute.
+        timeout (float): Seconds the command may run before it is stopped.
+        announce_progress (bool): Let the user follow and cancel a long command. Off when running
+            in a worker thread.
     
     Returns:
         str or Exception: The output of the command or the exception if it fails.
     """    
+    global last_command_stopped
+    if announce_progress:
+        last_command_stopped = None
     try:
-        # Check if the command is a 'cd' command
-        if command.startswith("cd "):
-            # Extract the directory path after 'cd' and strip any surrounding whitespace
-            path = command[3:].strip()
+        # A new shell per command cannot change our directory, so 'cd' is handled here
+        if shell is None and command.startswith("cd "):
+            # Extract the directory path after 'cd' and strip any surrounding whitespace and quotes
+            path = command[3:].strip().strip("'\"")
             os.chdir(path)
             current_dir = os.getcwd()
             logger.info(f"Changed directory to {current_dir}")
             return f"Changed directory to {current_dir}"
         
         elif command.startswith("find "):
-            result = subprocess.run(command, shell=True,capture_output=True, text=True)
-            output = result.stdout.strip()
+            output, _, _ = run_captured(command, timeout, announce_progress)
             logger.info(f"Find command output: {output}")
-            return result.stdout.strip()
+            return output
 
         else:
             # Execute other bash commands
-            result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-            output = result.stdout.strip()
+            cwd = os.getcwd()
+            output, stderr, returncode = run_captured(command, timeout, announce_progress)
+            if returncode != 0 and not (announce_progress and last_command_stopped):
+                if "No such file or directory" in stderr:
+                    raise FileNotFoundError(stderr.strip())
+                raise subprocess.CalledProcessError(returncode, command, output=output, stderr=stderr)
+            if not output and os.getcwd() != cwd:
+                logger.info(f"Changed directory to {os.getcwd()}")
+                return f"Changed directory to {os.getcwd()}"
             logger.info(f"Bash command output: {output}")
             return output
 
@@ -273,13 +576,25 @@ def execute_command(command):
         return e
     
 
+# The error path runs its LLM calls and the find search side by side
+error_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="error-path")
+ERROR_CALL_TIMEOUT = float(os.getenv("ERROR_CALL_TIMEOUT", "10"))
+FIND_TIMEOUT = float(os.getenv("FIND_TIMEOUT", "30"))
+
+# Missing items are looked up in a filename index built in the background, instead of walking
+# the file system with find on every error
+FILE_INDEX = os.getenv("FILE_INDEX", "1") == "1"
+file_index = FileIndex.from_env()
+
+
     # error handler functions
-def generate_missing_file(error_message):
+def generate_missing_file(error_message, announce_errors=True):
     """
     Identifies the missing file or directory from an error message using the Groq LLM.
     
     Args:
         error_message (str): The error message containing information about the missing item.
+        announce_errors (bool): Speak a message if the call fails. Off when running in a worker thread.
     
     Returns:
         str: The name of the missing file or directory.
@@ -304,16 +619,13 @@ If the error message is: "Exception occurred: [Errno 2] No such file or director
     ]
     
     try:
-        response = client.chat.completions.create(
-            messages=messages,
-            model="llama3-70b-8192"
-        )
-        missing_item = response.choices[0].message.content.strip()
+        missing_item = llm.complete(messages)
         logger.info(f"Missing item identified: {missing_item}")
         return missing_item
     except Exception as e:
         logger.error(f"Error during missing file identification: {e}")
-        speak("I encountered an error while identifying the missing file.")
+        if announce_errors:
+            speak("I encountered an error while identifying the missing file.")
         return None
 
 
@@ -335,17 +647,42 @@ def generate_find_command(missing_item):
     if os_name == 'Windows':
         find_command = f'dir /s /b *{missing_item}*'
     else:
-        find_command = f"find / -name '{missing_item}' -maxdepth 5 2>/dev/null"
+        find_command = f"find / -maxdepth 5 -name {shlex.quote(missing_item)} 2>/dev/null"
     logger.info(f"Find command generated: {find_command}")
     return find_command
 
 
-def explainError(error_message):
+def find_missing_item(missing_future):
+    """
+    Runs the find search as soon as the missing item has been identified.
+    
+    The search only reads the file system, so it can start before the user is told about it.
+    Once the filename index is ready it answers instead of find, with near matches ranked by
+    closeness to the current directory.
+    
+    Args:
+        missing_future (Future): The pending result of generate_missing_file.
+    
+    Returns:
+        str or None: The find output, or None if the missing item could not be identified.
+    """
+    missing_item = missing_future.result(timeout=ERROR_CALL_TIMEOUT)
+    if not missing_item:
+        return None
+    if FILE_INDEX and file_index.ready.is_set():
+        matches = file_index.search(missing_item, cwd=os.getcwd())
+        logger.info(f"File index matches for '{missing_item}': {matches}")
+        return "\n".join(path for _, path in matches)
+    return execute_command(generate_find_command(missing_item), timeout=FIND_TIMEOUT, announce_progress=False)
+
+
+def explainError(error_message, announce_errors=True):
     """
     Provides a concise explanation of a Python exception using the Groq LLM.
     
     Args:
         error_message (str): The Python exception message.
+        announce_errors (bool): Speak a message if the call fails. Off when running in a worker thread.
     
     Returns:
         str: A brief explanation of the error.
@@ -362,25 +699,29 @@ def explainError(error_message):
     ]
     
     try:
-        response = client.chat.completions.create(
-            messages=messages,
-            model="llama3-70b-8192"
-        )
-        explained_error = response.choices[0].message.content.strip()
+        explained_error = llm.complete(messages)
         logger.info(f"Error explanation: {explained_error}")
         return explained_error
     except Exception as e:
         logger.error(f"Error during error explanation: {e}")
-        speak("I encountered an error while trying to explain the issue.")
+        if announce_errors:
+            speak("I encountered an error while trying to explain the issue.")
         return "An error occurred while processing your request."
 
 
-def pipeline(request):
+# The command behind the latest result, so ReadSolution can tell how to read it
+last_bash_command = None
+
+
+@traced("pipeline")
+def pipeline(request, bash_command=None):
     """
     Processes a user request by generating and executing the appropriate bash command.
     
     Args:
         request (str): The user's request.
+        bash_command (str, optional): A command already produced by plan_command. When omitted
+            the command is generated from the request.
     
     Returns:
         str: The result of the executed command or an error message.
@@ -390,13 +731,16 @@ def pipeline(request):
     
     try:
         # Generate and execute the primary bash command
-        bash_command = generate_bash_command(request, cwd,os_name)
+        if not bash_command:
+            bash_command = generate_bash_command(request, cwd,os_name)
         if not bash_command:
             logger.error("Bash command generation failed.")
             speak("I couldn't generate a bash command for your request.")
             return "Command generation failed."        
         
         # Execute the generated bash command
+        global last_bash_command
+        last_bash_command = bash_command
         result = execute_command(bash_command)
         
         # If the result is an exception, raise it to be handled in the except block
@@ -408,44 +752,77 @@ def pipeline(request):
     
 
     except Exception as e:
-        # Fallback: Identify the missing item and generate a 'find' command
-        explained_error = explainError(str(e))
-        # print(explained_error)
-        logger.error(f"Error during pipeline execution: {explained_error}")
-    
-
-        # Check if the exception is related to a missing file or directory
-        if isinstance(e, FileNotFoundError):
-            # Identify the missing item from the error message
-            missing_item = generate_missing_file(str(e))
-            if missing_item:
-                logger.info(f"Searching for missing item: {missing_item}")
-                speak(f"Searching for the missing item: {missing_item}")
-                
-                # Generate and execute the 'find' command to locate the missing item
-                find_command = generate_find_command(missing_item)
-                find_result = execute_command(find_command)
-                return find_result if find_result else "Missing item not found."
-            else:
-                return "Could not determine the missing item from the error message."
-        else:
-            if explained_error:
-                return explained_error
+        # Fallback: explain the error and, for a missing file, identify and search for it.
+        # The LLM calls are independent, so they run concurrently.
+        started = time.perf_counter()
+        error_message = str(e)
+        explain_future = error_executor.submit(explainError, error_message, False)
+        explain_future.add_done_callback(
+            lambda future: logger.error(f"Error during pipeline execution: {future.result()}"))
+
+        try:
+            # Check if the exception is related to a missing file or directory
+            if isinstance(e, FileNotFoundError):
+                # The find search starts in the background as soon as the missing item is known
+                missing_future = error_executor.submit(generate_missing_file, error_message, False)
+                find_future = error_executor.submit(find_missing_item, missing_future)
+                try:
+                    missing_item = missing_future.result(timeout=ERROR_CALL_TIMEOUT)
+                except FutureTimeoutError:
+                    logger.error("Timed out identifying the missing item.")
+                    missing_item = None
+                if missing_item:
+                    logger.info(f"Searching for missing item: {missing_item}")
+                    speak(f"Searching for the missing item: {missing_item}")
+                    try:
+                        find_result = find_future.result(timeout=FIND_TIMEOUT)
+                    except FutureTimeoutError:
+                        logger.error(f"Find for '{missing_item}' timed out after {FIND_TIMEOUT}s.")
+                        find_result = None
+                    if isinstance(find_result, BaseException):
+                        find_result = None
+                    return find_result if find_result else "Missing item not found."
+                else:
+                    return "Could not determine the missing item from the error message."
             else:
-                return "An unknown error occurred during command execution."
-
-
-def ReadSolution(question,result):
+                try:
+                    explained_error = explain_future.result(timeout=ERROR_CALL_TIMEOUT)
+                except FutureTimeoutError:
+                    logger.error("Timed out explaining the error.")
+                    explained_error = None
+                if explained_error:
+                    return explained_error
+                else:
+                    return "An unknown error occurred during command execution."
+        finally:
+            logger.info(f"Error path latency: {time.perf_counter() - started:.2f}s")
+
+
+@traced("verbalize")
+def ReadSolution(question,result,speak_response=False):
     """
     Formats the bash command and its response for text-to-speech readability.
     
     Args:
         question (str): The bash command executed.
         result (str): The response/output from the bash command.
+        speak_response (bool): Speak the response sentence by sentence while it is generated.
     
     Returns:
         str: A formatted explanation suitable for TTS.
     """    
+    # Long output gets a compact summary and its first page; listings, paths, counts, empty
+    # output and find results are read out without the LLM
+    if output_pager is not None and not output_pager.announced:
+        local_response = output_pager.summary()
+    else:
+        local_response = verbalize(result, os.getcwd(), last_bash_command)
+    if local_response is not None:
+        logger.info(f"Formatted response for TTS locally: {local_response}")
+        if speak_response:
+            speak(local_response)
+        return local_response
+
     messages = [
 
         {
@@ -464,11 +841,10 @@ IF THE COMMAND DOES NOT MAKE SENSE, RESPOND WITH "SORRY, GIVE DOCUMENT COMMANDS
     ]
     
     try:
-        response = client.chat.completions.create(
-            messages=messages,
-            model="llama3-70b-8192"
-        )
-        formatted_response = response.choices[0].message.content.strip()
+        if speak_response:
+            formatted_response = speak_stream(llm.stream(messages))
+        else:
+            formatted_response = llm.complete(messages)
         logger.info(f"Formatted response for TTS: {formatted_response}")
         return formatted_response
     except Exception as e:
@@ -476,32 +852,144 @@ IF THE COMMAND DOES NOT MAKE SENSE, RESPOND WITH "SORRY, GIVE DOCUMENT COMMANDS
         speak("I encountered an error while formatting the response.")
         return "I encountered an error while processing your request."
 
-speak("I can now start assisting you!")
-logger.info("System is ready to assist the user.")
-
-while(True):
-
-    speech_recog.record_audio("audio_sample.wav", duration=7)
-    command  = speech_recog.process_audio_with_whisper("audio_sample.wav")
-    logger.info(f"User command received: {command}")
-    print(f"Command: {command}")
-
-    # Check for termination commands
-    if command is None or "end" in command.lower():
-        speak("Ending the session. Goodbye!")
-        logger.info("Session terminated by the user.")
-        break
-
-    # Recognize the intent of the command
-    intent = recognize_intent_with_llm(command)
-    if intent == "Document Operation":
-        # Handle document-related operations
-        doc_main(command, speech_recog=speech_recog)
-        speak("You are now back to your operating system.")
-        logger.info("Returned to operating system after document operation.")
-    else:
-        # Handle bash command executions
-        response = ReadSolution(command, pipeline(command))
-        print(f"Response: {response}")
-        speak(response)
-        logger.info("Bash command execution completed.")
\ No newline at end of file
+# Per-turn latency of bash commands, split by whether the fast path handled them
+turn_latencies = {"fast": [], "llm": []}
+
+
+def main(speech_recog=None):
+    """
+    Runs the voice assistant until the user ends the session.
+    
+    Args:
+        speech_recog (STT, optional): The speech recognizer to listen with. By default one is created
+            for the microphone; the replay harness passes a scripted one.
+    """
+    global active_speech_recog, last_command_stopped
+    if speech_recog is None:
+        # Initialize Speech-to-Text (STT) system
+        try:
+            speech_recog = STT()
+            logger.info("Speech-to-Text system initialized.")
+        except ImportError as e:
+            logger.error(f"Failed to import STT class: {e}")
+            speak("Speech recognition system is not available.")
+            sys.exit(1)
+        except Exception as e:
+            logger.error(f"Error initializing STT system: {e}")
+            speak("An error occurred while initializing the speech recognition system.")
+            sys.exit(1)
+
+    active_speech_recog = speech_recog
+
+    if SEMANTIC_CACHE:
+        threading.Thread(target=semantic_embedder.embed, args=("warm up",), daemon=True).start()
+    if FILE_INDEX:
+        file_index.start()
+
+    speak("I can now start assisting you!")
+    logger.info("System is ready to assist the user.")
+
+    # Span covering the current turn, from listening to the spoken response
+    turn_span = None
+
+    while(True):
+
+        if turn_span is not None:
+            turn_span.end()
+            turn_span = None
+
+        start = None
+        if speech_recog.idle_mode:
+            # Stay idle until the wake phrase or sustained speech, then transcribe the command
+            start = speech_recog.wait_for_wake()
+            if start is None:
+                speak("Yes?")
+        tracing.next_turn()
+        turn_span = tracing.start_span("turn")
+        command  = speech_recog.listen(start=start)
+        logger.info(f"User command received: {command}")
+        print(f"Command: {command}")
+
+        # Check for termination commands
+        if command is None or "end" in command.lower():
+            speak("Ending the session. Goodbye!")
+            logger.info(f"LLM cache statistics: {get_cache().stats()}")
+            if SEMANTIC_CACHE:
+                logger.info(f"Semantic cache statistics: intent {intent_semantic_cache.stats()}, "
+                            f"bash {bash_command_cache.stats()}")
+            logger.info(f"Responses verbalized locally: {verbalizer_stats['local']}, "
+                        f"by the LLM: {verbalizer_stats['llm']}")
+            if any(resolver_stats.values()):
+                logger.info(f"Documents resolved locally: {resolver_stats['local']}, after asking: "
+                            f"{resolver_stats['asked']}, by the LLM: {resolver_stats['llm']}")
+            if fast_path_stats["turns"]:
+                logger.info(f"Fast path matched {fast_path_stats['matched']}/{fast_path_stats['turns']} commands")
+            for path, latencies in turn_latencies.items():
+                if latencies:
+                    logger.info(f"Mean turn latency ({path} path): {sum(latencies) / len(latencies):.2f}s "
+                                f"over {len(latencies)} turns")
+            if FILE_INDEX:
+                file_index.stop()
+            if shell is not None:
+                shell.close()
+            logger.info("Session terminated by the user.")
+            turn_span.end()
+            logger.info(f"Trace written to {tracing.TRACE_PATH}; run 'python tracing.py' for a latency report.")
+            break
+
+        turn_started = time.perf_counter()
+        # Documents in folders the user worked in are found by name from anywhere
+        remember_directory(os.getcwd())
+
+        # Read the next page of the last long output
+        if output_pager is not None and is_more_request(command):
+            response = output_pager.next_page()
+            print(f"Response: {response}")
+            speak(response)
+            continue
+
+        # Common file-system requests map straight to a command. Otherwise recognize the intent
+        # locally when possible, or plan the command in one call
+        plan = match_fast_command(command, os.getcwd(), os_name)
+        turn_path = "fast" if plan else "llm"
+        turn_span.set(path=turn_path)
+        intent = plan["intent"] if plan else classify_intent_locally(command)
+        if not plan and not intent:
+            plan = plan_command(command, os.getcwd(), os_name)
+        if not intent:
+            intent = plan["intent"] if plan else recognize_intent_with_llm(command)
+        if intent == "Document Operation":
+            # Handle document-related operations
+            doc_main(command, speech_recog=speech_recog, filename=plan["filename"] if plan else None)
+            speak("You are now back to your operating system.")
+            logger.info("Returned to operating system after document operation.")
+        else:
+            # Handle bash command executions. A turn that runs no command must not report the
+            # previous turn's stopped command
+            last_command_stopped = None
+            result = pipeline(command, bash_command=plan["bash_command"] if plan else None)
+            has_new_pages = output_pager is not None and not output_pager.announced
+            if last_command_stopped:
+                # Whatever the command found before it was stopped is still read out
+                if last_command_stopped == "timeout":
+                    speak(f"The command was still running after {COMMAND_TIMEOUT:.0f} seconds, so I stopped it.")
+                else:
+                    speak("I stopped the command.")
+            if last_command_stopped and not result:
+                response = "It had not printed anything yet."
+                speak(response)
+            elif plan and not plan["needs_verbalization"] and not has_new_pages:
+                response = result if result else "Done."
+                speak(response)
+            else:
+                response = ReadSolution(command, result, speak_response=True)
+            print(f"Response: {response}")
+            logger.info("Bash command execution completed.")
+
+            turn_latency = time.perf_counter() - turn_started
+            turn_latencies[turn_path].append(turn_latency)
+            logger.info(f"Turn latency ({turn_path} path): {turn_latency:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
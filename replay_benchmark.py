@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# The harness replaces the microphone, speaker and network before any app module reads its settings
+os.environ.setdefault("TTS_BACKEND", "null")
+os.environ.setdefault("LLM_BACKEND", "openai")
+os.environ.setdefault("LLM_CACHE", "0")
+os.environ.setdefault("SEMANTIC_CACHE", "0")
+os.environ.setdefault("STT_IDLE_MODE", "0")
+os.environ.setdefault("STT_STREAMING", "0")
+os.environ.setdefault("FILE_INDEX", "0")
+os.environ.setdefault("TRACE_PATH", os.path.join(tempfile.mkdtemp(prefix="blindsight_trace_"), "trace.jsonl"))
+
+from scipy.io import wavfile
+
+import tracing
+from audio_preprocess import preprocess
+from calibrate_whisper import load_calibration
+from llm_client import MockChatServer, default_mock_reply
+from STT import SAMPLE_RATE, STT
+from whisper_engine import WhisperEngine
+
+
+class ReplaySTT(STT):
+    """
+    Plays back a scripted session instead of listening to the microphone.
+
+    Each turn is either a WAV file, which goes through the real preprocessing and whisper path,
+    or a ready transcript under "text". When the script runs out the session is ended.
+    """
+
+    def __init__(self, turns):
+        self.turns = list(turns)
+        self.heard = []
+        self.microphone = None
+        self.stream = None
+        self.spotter = None
+        self.idle_mode = False
+        self.calibration = load_calibration()
+        self.input_rate = SAMPLE_RATE
+        self.whisper_rtf = self.calibration.get("rtf")
+        self.last_preprocess = None
+        self.last_stream_timings = None
+        self.engine = None
+        if any(turn.get("wav") for turn in self.turns):
+            self.engine = WhisperEngine.from_env(threads=self.calibration.get("threads"),
+                                                 model_path=self.calibration.get("model_path"))
+
+    @tracing.traced("stt.listen")
+    def listen(self, max_duration=15, trailing_silence=None, start=None):
+        if not self.turns:
+            return "end"
+        turn = self.turns.pop(0)
+        if turn.get("wav"):
+            rate, audio = wavfile.read(turn["wav"])
+            if audio.ndim > 1:
+                audio = audio.mean(axis=1).astype(audio.dtype)
+            with tracing.span("stt.record", seconds=len(audio) / rate):
+                audio, self.last_preprocess = preprocess(audio, rate)
+            text = self.process_audio_with_whisper(audio=audio)
+        else:
+            text = turn["text"]
+        self.heard.append({"turn": tracing.current_turn, "text": text, "expected": turn.get("text")})
+        return text
+
+
+def scripted_responder(rules):
+    """
+    Builds a mock LLM responder from the session's canned responses.
+
+    Each rule may match on a substring of the system prompt ("system"), of the last user message
+    ("match", case-insensitive) and on JSON mode ("json"). The first matching rule's "reply" is
+    returned (objects are sent as JSON), with its own "latency" if it has one. Requests no rule
+    matches get default_mock_reply.
+    """
+    def respond(messages, request):
+        system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+        user = messages[-1]["content"].lower() if messages else ""
+        json_mode = request.get("response_format", {}).get("type") == "json_object"
+        for rule in rules:
+            if "system" in rule and rule["system"] not in system:
+                continue
+            if "match" in rule and rule["match"].lower() not in user:
+                continue
+            if "json" in rule and rule["json"] != json_mode:
+                continue
+            reply = rule["reply"] if isinstance(rule["reply"], str) else json.dumps(rule["reply"])
+            return (reply, rule["latency"]) if "latency" in rule else reply
+        return default_mock_reply(messages, request)
+    return respond
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_session(session_path):
+    """
+    Runs pipeline.main() on a scripted session and collects latency and resource figures.
+
+    Returns:
+        dict: Per-turn and per-stage latency, LLM call counts, peak RSS and what was spoken.
+    """
+    with open(session_path, "r", encoding="utf-8") as f:
+        session = json.load(f)
+    session_dir = os.path.dirname(os.path.abspath(session_path))
+    turns = [dict(turn, wav=os.path.join(session_dir, turn["wav"])) if turn.get("wav") else turn
+             for turn in session["turns"]]
+
+    mock = session.get("mock", {})
+    server = MockChatServer(latency=mock.get("latency", 0.3), token_delay=mock.get("token_delay", 0.02),
+                            responder=scripted_responder(mock.get("responses", []))).start()
+    os.environ["LLM_BASE_URL"] = server.url
+
+    # Imported here so it picks up the mock server
+    import pipeline
+    import TTS
+
+    # Commands run in a scratch copy of the session's files
+    workdir = tempfile.mkdtemp(prefix="blindsight_replay_")
+    for name in session.get("files", []):
+        shutil.copy(os.path.join(session_dir, name), workdir)
+    original_cwd = os.getcwd()
+    os.chdir(workdir)
+
+    speech_recog = ReplaySTT(turns)
+    started = time.perf_counter()
+    try:
+        pipeline.main(speech_recog=speech_recog)
+    finally:
+        elapsed = time.perf_counter() - started
+        os.chdir(original_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        server.stop()
+
+    spans = tracing.load_spans([tracing.TRACE_PATH]) if os.path.isfile(tracing.TRACE_PATH) else []
+    turn_spans = {record["turn"]: record for record in spans if record["name"] == "turn"}
+    per_turn = []
+    for heard in speech_recog.heard:
+        record = turn_spans.get(heard["turn"])
+        per_turn.append({"turn": heard["turn"], "text": heard["text"], "expected": heard["expected"],
+                         "path": record.get("path") if record else None,
+                         "seconds": record["duration"] if record else None})
+
+    return {
+        "session": session.get("name", os.path.basename(session_path)),
+        "seconds": elapsed,
+        "turns": per_turn,
+        "stages": tracing.stage_report(spans),
+        "llm_requests": server.requests,
+        "llm_calls": pipeline.llm.calls,
+        "llm_retries": pipeline.llm.retries,
+        "peak_rss_mb": peak_rss_mb(),
+        "spoken": [text for _, text in getattr(TTS.engine, "spoken", [])]
+    }
+
+
+def compare(results, baseline, tolerance, floor=0.005):
+    """
+    Lists regressions against a stored baseline: stage p50/p95 slower by more than `tolerance`
+    (and by at least `floor` seconds), more LLM requests, or higher peak RSS.
+    """
+    regressions = []
+    for name, row in results["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            continue
+        for key in ("p50", "p95"):
+            if row[key] > base[key] * (1 + tolerance) and row[key] - base[key] > floor:
+                regressions.append(f"{name} {key}: {1000 * base[key]:.1f} ms -> {1000 * row[key]:.1f} ms")
+    if results["llm_requests"] > baseline["llm_requests"]:
+        regressions.append(f"LLM requests: {baseline['llm_requests']} -> {results['llm_requests']}")
+    if results["peak_rss_mb"] and baseline.get("peak_rss_mb") \
+            and results["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS: {baseline['peak_rss_mb']:.0f} MB -> {results['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def print_results(results):
+    print(f"\nSession: {results['session']} ({results['seconds']:.2f}s)")
+    print(f"{'turn':>4}  {'path':<5} {'seconds':>8}  text")
+    for turn in results["turns"]:
+        seconds = f"{turn['seconds']:.3f}" if turn["seconds"] is not None else "-"
+        print(f"{turn['turn']:>4}  {turn['path'] or '-':<5} {seconds:>8}  {turn['text']}")
+    print()
+    tracing.print_report(results["stages"])
+    rss = f"{results['peak_rss_mb']:.0f} MB" if results["peak_rss_mb"] else "n/a"
+    print(f"\nLLM requests: {results['llm_requests']} ({results['llm_retries']} retries), peak RSS: {rss}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a scripted session through the real pipeline "
+                                                 "with a mock LLM server and no audio devices.")
+    parser.add_argument("session", help="Session JSON file, e.g. test/sessions/basic.json")
+    parser.add_argument("-o", "--output", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="Results JSON to compare against; exits 1 on regressions")
+    parser.add_argument("--save-baseline", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown before a stage counts as regressed")
+    args = parser.parse_args()
+
+    results = run_session(args.session)
+    print_results(results)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
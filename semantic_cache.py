@@ -0,0 +1,337 @@
+import collections
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Create logs directory if it doesn't exist
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+# Generate timestamp for log filename
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(f"logs/blindsight_{timestamp}.log")
+    ]
+)
+
+# Create logger for the specific module
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Words two requests for the same shell command may differ in
+FILLER_WORDS = frozenset({"a", "an", "the", "please", "can", "could", "would", "will", "you", "me", "i", "my",
+                          "to", "of", "for", "in", "inside", "here", "this", "that", "called", "named", "some",
+                          "all", "just", "now", "hey", "okay", "ok", "go", "ahead", "and", "then"})
+
+
+class SentenceEmbedder:
+    """
+    Small CPU sentence-embedding model (mean-pooled transformer outputs, L2-normalized).
+
+    The model is loaded on first use. If transformers or torch are missing, or the model cannot
+    be loaded, the embedder reports itself unavailable and the semantic cache stays empty.
+    """
+
+    def __init__(self, model_name=None):
+        self.model_name = model_name or os.getenv("SEMANTIC_CACHE_MODEL", DEFAULT_MODEL)
+        self.tokenizer = None
+        self.model = None
+        self.available = True
+        self.loaded = threading.Event()
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+
+            started = time.perf_counter()
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.model = AutoModel.from_pretrained(self.model_name)
+            self.model.eval()
+            torch.set_grad_enabled(False)
+            logger.info(f"Loaded embedding model {self.model_name} in {time.perf_counter() - started:.2f}s")
+            self.loaded.set()
+        except Exception as e:
+            logger.error(f"Semantic cache disabled, could not load {self.model_name}: {e}")
+            self.available = False
+
+    def embed(self, text, wait=True):
+        """
+        Embeds a sentence.
+
+        Args:
+            wait (bool): Load the model first if needed. Without it, None is returned until the
+                model has been loaded elsewhere, e.g. by a warm-up thread, so a lookup never
+                waits for a load or a download.
+
+        Returns:
+            numpy.ndarray or None: A unit-length float32 vector, or None if the model is unavailable.
+        """
+        if not self.loaded.is_set():
+            if not wait:
+                return None
+            with self._load_lock:
+                if self.model is None and self.available:
+                    self._load()
+        if not self.available:
+            return None
+
+        import torch
+
+        with self._lock:
+            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, max_length=64)
+            with torch.no_grad():
+                output = self.model(**inputs).last_hidden_state[0]
+            mask = inputs["attention_mask"][0].unsqueeze(-1).float()
+            vector = ((output * mask).sum(dim=0) / mask.sum()).numpy().astype(np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-12)
+
+
+def salient_tokens(text):
+    """
+    Tokens that must match exactly for two commands to share an answer: anything that looks like
+    a filename, number or path, e.g. "notes2.txt" or "2024".
+    """
+    return frozenset(t for t in re.findall(r"[\w./-]+", text.lower()) if re.search(r"[\d._/]", t))
+
+
+def content_tokens(text):
+    """
+    Tokens that must match exactly for two requests to share a shell command: every word but the
+    fillers, in order, so the verb, its objects and their order all agree. "list the files please"
+    reuses the command for "list files", while "delete the folder photos" never reuses one for
+    "create a folder called photos", nor "copy b.txt to a.txt" one for "copy a.txt to b.txt".
+    """
+    return tuple(t for t in re.findall(r"[\w./-]+", text.lower()) if t not in FILLER_WORDS)
+
+
+class SemanticCache:
+    """
+    Reuses a previous answer when a new transcript is close enough in meaning to an old one.
+
+    Embeddings live in a preallocated NumPy matrix and lookups are a single matrix-vector product.
+    An answer is only reused when the cosine similarity reaches `threshold`, the context matches
+    and the salient tokens (filenames, numbers) are identical. When full, the least recently used
+    entry is replaced. Until the embedding model has loaded, every lookup misses and nothing is
+    stored, so the first turns never wait for it.
+    """
+
+    def __init__(self, name, embedder, threshold=None, max_entries=512):
+        self.name = name
+        self.embedder = embedder
+        self.threshold = threshold if threshold is not None else float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+        self.max_entries = max_entries
+        self.vectors = None
+        self.entries = []
+        self.last_used = np.zeros(max_entries, dtype=np.float64)
+        self.hits = 0
+        self.misses = 0
+        self.lookup_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def lookup(self, text, context=None):
+        """
+        Finds a cached answer for a transcript.
+
+        Args:
+            text (str): The transcript.
+            context (dict, optional): State the answer depends on, such as cwd.
+
+        Returns:
+            str or None: The cached answer.
+        """
+        started = time.perf_counter()
+        vector = self.embedder.embed(text, wait=False)
+        answer = None
+        if vector is not None:
+            with self._lock:
+                if self.entries:
+                    similarities = self.vectors[:len(self.entries)] @ vector
+                    tokens = salient_tokens(text)
+                    for index in np.argsort(similarities)[::-1]:
+                        if similarities[index] < self.threshold:
+                            break
+                        entry = self.entries[index]
+                        if entry["context"] == context and entry["tokens"] == tokens:
+                            self.last_used[index] = time.monotonic()
+                            answer = entry["answer"]
+                            logger.info(f"Semantic {self.name} cache hit: '{text}' ~ '{entry['text']}' "
+                                        f"({similarities[index]:.3f})")
+                            break
+
+        self.lookup_seconds += time.perf_counter() - started
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    def add(self, text, answer, context=None):
+        """
+        Stores an answer for a transcript, evicting the least recently used entry when full.
+        """
+        vector = self.embedder.embed(text, wait=False)
+        if vector is None or answer is None:
+            return
+        with self._lock:
+            if self.vectors is None:
+                self.vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            entry = {"text": text, "answer": answer, "context": context, "tokens": salient_tokens(text)}
+            if len(self.entries) < self.max_entries:
+                index = len(self.entries)
+                self.entries.append(entry)
+            else:
+                index = int(np.argmin(self.last_used))
+                self.entries[index] = entry
+            self.vectors[index] = vector
+            self.last_used[index] = time.monotonic()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "mean_lookup_ms": 1000 * self.lookup_seconds / total if total else 0.0
+        }
+
+
+class CommandCache:
+    """
+    Reuses a shell command for a request with the same content words in the same context, e.g.
+    "list the files please" after "list files".
+
+    Requests that only mean the same thing are not matched: a similar sounding request could run a
+    different action, and the common read-only ones ("where am I", "list files") are already
+    answered by the fast path. No embedding is needed, so a lookup is a dictionary access. When
+    full, the least recently used entry is dropped.
+    """
+
+    def __init__(self, name, max_entries=512):
+        self.name = name
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lookup_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text, context):
+        return content_tokens(text), tuple(sorted((context or {}).items()))
+
+    def lookup(self, text, context=None):
+        """
+        Finds the cached command for a request.
+
+        Returns:
+            str or None: The cached command.
+        """
+        started = time.perf_counter()
+        key = self._key(text, context)
+        with self._lock:
+            answer = self.entries.get(key)
+            if answer is not None:
+                self.entries.move_to_end(key)
+        self.lookup_seconds += time.perf_counter() - started
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            logger.info(f"{self.name.capitalize()} command cache hit: '{text}'")
+        return answer
+
+    def add(self, text, answer, context=None):
+        """
+        Stores the command generated for a request, dropping the least recently used one when full.
+        """
+        if answer is None:
+            return
+        key = self._key(text, context)
+        with self._lock:
+            self.entries[key] = answer
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "mean_lookup_ms": 1000 * self.lookup_seconds / total if total else 0.0
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description="Replay transcripts through the command and semantic caches.")
+    parser.add_argument("transcripts", nargs="*",
+                        help="Text files with one transcript per line, optionally 'group<TAB>transcript' "
+                             "to check that hits share a group, e.g. test/cache_transcripts.tsv "
+                             "(default: commands found in logs/*.log)")
+    parser.add_argument("--threshold", type=float, nargs="+", default=[0.85, 0.9, 0.95])
+    parser.add_argument("--llm-latency", type=float, default=0.8,
+                        help="Seconds one LLM round trip costs, used to estimate savings")
+    args = parser.parse_args()
+
+    rows = []
+    if args.transcripts:
+        for path in args.transcripts:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        group, _, text = line.rpartition("\t")
+                        rows.append((group or None, text))
+    else:
+        for path in sorted(glob.glob("logs/*.log")):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    match = re.search(r"User command received: (.+)$", line)
+                    if match and match.group(1) != "None":
+                        rows.append((None, match.group(1).strip()))
+
+    if not rows:
+        print("No transcripts to replay.")
+        sys.exit(1)
+
+    def replay(cache):
+        wrong = 0
+        for group, text in rows:
+            answer = cache.lookup(text)
+            if answer is None:
+                cache.add(text, group or text)
+            elif group is not None and answer != group:
+                wrong += 1
+        stats = cache.stats()
+        saved = stats["hits"] * args.llm_latency - cache.lookup_seconds
+        return (f"{len(rows)} transcripts, hit rate {stats['hit_rate']:.3f}, wrong hits {wrong}, "
+                f"lookup {stats['mean_lookup_ms']:.3f} ms, estimated time saved {saved:.1f}s")
+
+    print(f"command cache: {replay(CommandCache('replay'))}")
+
+    embedder = SentenceEmbedder()
+    if embedder.embed(rows[0][1]) is None:
+        print("Embedding model unavailable, semantic cache thresholds skipped.")
+        sys.exit(0)
+    for threshold in args.threshold:
+        print(f"threshold {threshold:.2f}: {replay(SemanticCache('replay', embedder, threshold=threshold))}")
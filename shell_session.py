@@ -0,0 +1,246 @@
+import logging
+import os
+import select
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from output_pager import CapturedOutput, capture_command
+
+# Create logs directory if it doesn't exist
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+# Generate timestamp for log filename
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(f"logs/blindsight_{timestamp}.log")
+    ]
+)
+
+# Create logger for the specific module
+logger = logging.getLogger(__name__)
+
+
+def child_pids(pid):
+    """
+    Lists the descendants of a process, deepest first, from /proc (Linux only).
+    """
+    children = []
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", "r") as f:
+            direct = [int(child) for child in f.read().split()]
+    except OSError:
+        return children
+    for child in direct:
+        children += child_pids(child) + [child]
+    return children
+
+
+class ShellSession:
+    """
+    One long-lived shell that runs every command, so no shell has to be started per command and
+    `cd` and `export` carry over from one command to the next like in a terminal.
+
+    Each command is sent to the shell's stdin wrapped in `eval`, followed by a line that prints a
+    random sentinel with the exit code and working directory to stdout, and the sentinel alone to
+    stderr. The reply is everything up to the sentinels. If the shell dies (a syntax error in
+    sh, or an `exit`), it is started again in the last known directory.
+    """
+
+    def __init__(self, shell=None):
+        self.shell = shell or shutil.which("bash") or "/bin/sh"
+        self.process = None
+        self.cwd = os.getcwd()
+        self.spawned = 0
+        self._lock = threading.Lock()
+
+    def _spawn(self):
+        args = [self.shell, "--norc", "--noprofile"] if os.path.basename(self.shell) == "bash" else [self.shell]
+        self.process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE, cwd=self.cwd, start_new_session=True)
+        self.spawned += 1
+        if self.spawned > 1:
+            logger.warning(f"Shell restarted in {self.cwd} (restart {self.spawned - 1}).")
+
+    def _kill_children(self, sig):
+        for pid in child_pids(self.process.pid):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def _kill_shell(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            stream.close()
+        self.process = None
+
+    def run(self, command, timeout=None, max_lines=40, max_bytes=8192, spill_limit=50 * 1024 * 1024,
+            cancel=None, output=None):
+        """
+        Runs a command in the shell, capturing stdout into a CapturedOutput as it is produced.
+
+        When the command outlives `timeout`, `cancel` is set, or its output passes `spill_limit`,
+        the processes it started are terminated and the output so far is returned, with
+        output.stopped saying why. A command that cannot be stopped that way (a loop in the shell
+        itself) takes the shell down with it, and a new one is started.
+
+        Args:
+            cancel (threading.Event, optional): Set from another thread to stop the command.
+            output (CapturedOutput, optional): Capture to fill, so another thread can follow the
+                progress. By default a new one is made from `max_lines` and `max_bytes`.
+
+        Returns:
+            tuple: (CapturedOutput, stderr text capped at `max_bytes`, exit code)
+        """
+        with self._lock:
+            if self.process is None or self.process.poll() is not None:
+                self._spawn()
+            token = uuid.uuid4().hex
+            # Follow a directory change made by the application itself
+            cwd = os.getcwd()
+            prefix = f"cd -- {shlex.quote(cwd)}\n" if cwd != self.cwd else ""
+            script = (f"{prefix}{{ eval {shlex.quote(command)}\n}} </dev/null\n"
+                      f"__blindsight_status=$?\n"
+                      f"printf '%s\\n' {token} >&2\n"
+                      f"printf '%s %d %s\\n' {token} \"$__blindsight_status\" \"$PWD\"\n")
+            try:
+                self.process.stdin.write(script.encode())
+                self.process.stdin.flush()
+            except BrokenPipeError:
+                self._kill_shell()
+                self._spawn()
+                self.process.stdin.write(script.encode())
+                self.process.stdin.flush()
+
+            if output is None:
+                output = CapturedOutput(max_lines, max_bytes)
+            marker = token.encode()
+            stdout_fd, stderr_fd = self.process.stdout.fileno(), self.process.stderr.fileno()
+            buffers = {stdout_fd: bytearray(), stderr_fd: bytearray()}
+            stderr = bytearray()
+            status = None
+            pending = {stdout_fd, stderr_fd}
+            deadline = time.monotonic() + timeout if timeout else None
+            stopped_at = None
+
+            while pending:
+                wait = 0.2 if deadline is None else max(min(0.2, deadline - time.monotonic()), 0)
+                ready, _, _ = select.select(list(pending), [], [], wait)
+                for fd in ready:
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        # The shell exited before finishing the command
+                        pending.clear()
+                        break
+                    buffer = buffers[fd]
+                    buffer += chunk
+                    found = buffer.find(marker)
+                    done = found >= 0 and buffer.find(b"\n", found) >= 0
+                    # Output up to the sentinel; until it arrives, only whole lines
+                    end = found if done else buffer.rfind(b"\n", 0, found if found >= 0 else len(buffer)) + 1
+                    if fd == stderr_fd:
+                        stderr += buffer[:end][:max(max_bytes - len(stderr), 0)]
+                    else:
+                        lines = bytes(buffer[:end]).decode(errors="replace").split("\n")
+                        if lines[-1] == "":
+                            lines.pop()
+                        if not output.truncated and not output.stopped:
+                            for line in lines:
+                                output.feed(line)
+                        if done:
+                            _, code, self.cwd = bytes(buffer[found:buffer.find(b"\n", found)]).decode().split(" ", 2)
+                            status = int(code)
+                    del buffer[:end]
+                    if done:
+                        pending.discard(fd)
+                if output.total_bytes > spill_limit and not output.truncated:
+                    output.truncated = True
+                    self._kill_children(signal.SIGTERM)
+
+                now = time.monotonic()
+                if stopped_at is None and pending:
+                    if cancel is not None and cancel.is_set():
+                        output.stopped = "cancelled"
+                    elif deadline is not None and now >= deadline:
+                        output.stopped = "timeout"
+                    if output.stopped:
+                        stopped_at = now
+                if stopped_at is not None and pending:
+                    # Anything the rest of the command line starts is stopped too
+                    self._kill_children(signal.SIGTERM if now - stopped_at <= 0.5 else signal.SIGKILL)
+                if stopped_at is not None and pending and now - stopped_at > 1:
+                    # Nothing left to kill but the shell itself
+                    break
+
+            if status is None:
+                try:
+                    status = self.process.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    status = -signal.SIGKILL
+                self._kill_shell()
+
+        # Keep the application's directory in step with the shell's
+        if self.cwd != os.getcwd():
+            try:
+                os.chdir(self.cwd)
+            except OSError as e:
+                logger.error(f"Could not follow the shell to {self.cwd}: {e}")
+
+        return output, stderr.decode(errors="replace"), status
+
+    def close(self):
+        with self._lock:
+            if self.process is not None:
+                self._kill_shell()
+
+
+if __name__ == "__main__":
+    import argparse
+    import statistics
+
+    parser = argparse.ArgumentParser(description="Compare command latency in a persistent shell with a new shell per command.")
+    parser.add_argument("-n", "--iterations", type=int, default=200)
+    parser.add_argument("commands", nargs="*", default=["true", "pwd", "ls", "echo hello | wc -c"])
+    args = parser.parse_args()
+
+    def report(label, timings):
+        timings = sorted(timings)
+        p95 = timings[int(0.95 * (len(timings) - 1))]
+        print(f"  {label:<22} mean {1000 * statistics.mean(timings):6.2f} ms   p50 {1000 * statistics.median(timings):6.2f} ms"
+              f"   p95 {1000 * p95:6.2f} ms")
+
+    session = ShellSession()
+    session.run("true")
+    for command in args.commands:
+        print(command)
+        timings = []
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            capture_command(command)[0].close()
+            timings.append(time.perf_counter() - started)
+        report("new shell per command", timings)
+        timings = []
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            session.run(command)[0].close()
+            timings.append(time.perf_counter() - started)
+        report("persistent shell", timings)
+    session.close()
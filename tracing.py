@@ -0,0 +1,212 @@
+import functools
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Create logs directory if it doesn't exist
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+# Generate timestamp for log filename
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(f"logs/blindsight_{timestamp}.log")
+    ]
+)
+
+# Create logger for the specific module
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("TRACE", "1") == "1"
+TRACE_PATH = os.getenv("TRACE_PATH", os.path.abspath(f"logs/trace_{timestamp}.jsonl"))
+
+_ids = itertools.count(1)
+_local = threading.local()
+_write_lock = threading.Lock()
+_file = None
+current_turn = 0
+
+
+def next_turn():
+    """
+    Starts a new turn; spans opened from now on are tagged with its number.
+    """
+    global current_turn
+    current_turn += 1
+    return current_turn
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _export(record):
+    global _file
+    with _write_lock:
+        try:
+            if _file is None:
+                _file = open(TRACE_PATH, "a", encoding="utf-8", buffering=1)
+            _file.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            logger.error(f"Could not write trace span: {e}")
+
+
+class Span:
+    """
+    A timed section of work, measured with the monotonic clock and written to the trace file
+    as one JSON line when it ends. Spans opened inside another span on the same thread record
+    it as their parent.
+    """
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.id = next(_ids)
+        self.parent = None
+        self.started = None
+
+    def set(self, **attributes):
+        """
+        Adds attributes to the span, e.g. whether a cache was hit.
+        """
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1].id if stack else None
+        self.turn = current_turn
+        self.wall = time.time()
+        self.started = time.monotonic()
+        stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.monotonic() - self.started
+        stack = _stack()
+        if self in stack:
+            stack.remove(self)
+        if ENABLED:
+            record = {"name": self.name, "id": self.id, "parent": self.parent, "turn": self.turn,
+                      "start": self.started, "wall": self.wall, "duration": duration,
+                      "thread": threading.current_thread().name}
+            if exc_type is not None:
+                record["error"] = exc_type.__name__
+            record.update(self.attributes)
+            _export(record)
+        return False
+
+    def end(self):
+        self.__exit__(None, None, None)
+
+
+def current_span():
+    """
+    Returns the innermost open span on this thread, or None.
+    """
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def span(name, **attributes):
+    """
+    Times a block of code:
+
+        with span("whisper", seconds=3.2) as s:
+            ...
+            s.set(text_length=42)
+    """
+    return Span(name, **attributes)
+
+
+def start_span(name, **attributes):
+    """
+    Opens a span that is closed later with .end(), for work that does not fit in one block.
+    """
+    return Span(name, **attributes).__enter__()
+
+
+def traced(name):
+    """
+    Decorator that wraps every call of a function in a span.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def percentile(sorted_values, fraction):
+    """
+    Linear-interpolated percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return float("nan")
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def load_spans(paths):
+    spans = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            spans += [json.loads(line) for line in f if line.strip()]
+    return spans
+
+
+def stage_report(spans):
+    """
+    Summarizes span durations per stage.
+
+    Returns:
+        dict: Stage name -> {"count", "p50", "p95", "total"} with times in seconds.
+    """
+    durations = {}
+    for record in spans:
+        durations.setdefault(record["name"], []).append(record["duration"])
+    report = {}
+    for name, values in durations.items():
+        values.sort()
+        report[name] = {"count": len(values), "p50": percentile(values, 0.5),
+                        "p95": percentile(values, 0.95), "total": sum(values)}
+    return report
+
+
+def print_report(report):
+    print(f"{'stage':<28} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'total s':>9}")
+    for name, row in sorted(report.items(), key=lambda item: -item[1]["total"]):
+        print(f"{name:<28} {row['count']:>6} {1000 * row['p50']:>9.1f} {1000 * row['p95']:>9.1f} "
+              f"{row['total']:>9.2f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description="Print p50/p95 latency per stage from trace files.")
+    parser.add_argument("traces", nargs="*", help="Trace JSONL files (default: the latest logs/trace_*.jsonl)")
+    args = parser.parse_args()
+
+    paths = args.traces or sorted(glob.glob("logs/trace_*.jsonl"), key=os.path.getmtime)[-1:]
+    if not paths:
+        print("No trace files found.")
+        sys.exit(1)
+    print(f"Trace: {', '.join(paths)}")
+    print_report(stage_report(load_spans(paths)))
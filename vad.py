@@ -0,0 +1,80 @@
+import numpy as np
+
+# Length of one analysis frame in milliseconds
+FRAME_MS = 30
+
+
+def frame_features(audio, frame_length):
+    """
+    Splits audio into non-overlapping frames and computes per-frame energy and zero-crossing rate.
+
+    Args:
+        audio (numpy.ndarray): Mono int16 or float samples. Trailing samples that do not fill
+            a whole frame are ignored.
+        frame_length (int): Number of samples per frame.
+
+    Returns:
+        tuple: (energy_db, zcr) arrays with one value per frame. Energy is in dBFS.
+    """
+    samples = np.asarray(audio).reshape(-1)
+    num_frames = len(samples) // frame_length
+    frames = samples[:num_frames * frame_length].reshape(num_frames, frame_length)
+
+    if frames.dtype == np.int16:
+        frames = frames.astype(np.float32) / 32768.0
+
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    energy_db = 20.0 * np.log10(rms + 1e-10)
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_length
+    return energy_db, zcr
+
+
+class VoiceActivityDetector:
+    """
+    Energy / zero-crossing voice activity detector with an adaptive noise floor.
+
+    A frame counts as speech when its energy is well above the running noise floor, or when it is
+    moderately above it with a high zero-crossing rate (unvoiced sounds such as "s" or "f").
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=FRAME_MS, threshold_db=12.0,
+                 min_energy_db=-55.0, zcr_threshold=0.25):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.min_energy_db = min_energy_db
+        self.zcr_threshold = zcr_threshold
+        self.noise_floor_db = None
+
+    def reset(self):
+        self.noise_floor_db = None
+
+    def is_speech(self, audio):
+        """
+        Classifies each frame of the given audio as speech or silence.
+
+        Args:
+            audio (numpy.ndarray): Mono samples, ideally a multiple of frame_length long.
+
+        Returns:
+            numpy.ndarray: Boolean array with one entry per frame.
+        """
+        energy_db, zcr = frame_features(audio, self.frame_length)
+        if len(energy_db) == 0:
+            return np.zeros(0, dtype=bool)
+
+        if self.noise_floor_db is None:
+            self.noise_floor_db = float(np.min(energy_db))
+
+        threshold = max(self.noise_floor_db + self.threshold_db, self.min_energy_db)
+        speech = (energy_db > threshold) | (
+            (energy_db > threshold - self.threshold_db / 2) & (zcr > self.zcr_threshold)
+        )
+
+        # Track the noise floor on frames that look like silence
+        silence = energy_db[~speech]
+        if len(silence):
+            self.noise_floor_db = 0.9 * self.noise_floor_db + 0.1 * float(np.mean(silence))
+        return speech
@@ -0,0 +1,130 @@
+import os
+import re
+import shlex
+
+# Names read out before the rest is summarized as "and N more"
+MAX_SPOKEN_NAMES = 20
+MAX_SPOKEN_PATHS = 5
+
+# How often the local verbalizer handled the output, and how often it fell back to the LLM
+stats = {"local": 0, "llm": 0}
+
+
+def spoken_path(path):
+    """
+    Reads a path from the innermost component outwards, e.g. "/home/ana/docs" -> "'docs' in 'ana' in 'home'".
+    """
+    parts = [part for part in os.path.normpath(path).split(os.sep) if part]
+    if not parts:
+        return "the root folder"
+    return " in ".join(f"'{part}'" for part in reversed(parts))
+
+
+def spoken_list(names, limit):
+    """
+    Joins names for speech, summarizing anything past `limit` as "and N more".
+    """
+    spoken = ", ".join(names[:limit])
+    if len(names) > limit:
+        spoken += f", and {len(names) - limit} more"
+    return spoken
+
+
+def listing_directory(bash_command, cwd):
+    """
+    Returns the directory a plain `ls` lists, or None for anything else (other commands,
+    several arguments, long formats).
+    """
+    try:
+        tokens = shlex.split(bash_command or "")
+    except ValueError:
+        return None
+    if not tokens or tokens[0] != "ls":
+        return None
+    flags = [token for token in tokens[1:] if token.startswith("-")]
+    arguments = [token for token in tokens[1:] if not token.startswith("-")]
+    if any(set(flag[1:]) - set("a1AF") for flag in flags) or len(arguments) > 1:
+        return None
+    return os.path.join(cwd, os.path.expanduser(arguments[0])) if arguments else cwd
+
+
+def verbalize_listing(lines, directory):
+    """
+    Groups `ls` output into folders and files using the directory's own metadata.
+
+    Returns:
+        str or None: The spoken listing, or None if the output does not match the directory.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            is_dir = {entry.name: entry.is_dir() for entry in entries}
+    except OSError:
+        return None
+    names = [line.rstrip("/*@|=") for line in lines if line not in (".", "..", "./", "../")]
+    if any(name not in is_dir for name in names):
+        return None
+    if not names:
+        return "The folder is empty."
+
+    folders = [name for name in names if is_dir[name]]
+    files = [name for name in names if not is_dir[name]]
+    sentences = []
+    if folders:
+        sentences.append(f"Here are the folders: {spoken_list(folders, MAX_SPOKEN_NAMES)}.")
+    if files:
+        sentences.append(f"Here are the files: {spoken_list(files, MAX_SPOKEN_NAMES)}.")
+    return " ".join(sentences)
+
+
+def verbalize(result, cwd, bash_command=None):
+    """
+    Turns common command output into a spoken sentence without the LLM.
+
+    Handles empty output, `pwd`-style paths, directory changes, bare counts, `ls` listings and
+    lists of existing paths such as find results.
+
+    Args:
+        result (str): The command output.
+        cwd (str): The directory the command ran in.
+        bash_command (str, optional): The command that produced the output.
+
+    Returns:
+        str or None: The sentence to speak, or None if the output should go to the LLM.
+    """
+    text = _verbalize(result, cwd, bash_command)
+    stats["local" if text is not None else "llm"] += 1
+    return text
+
+
+def _verbalize(result, cwd, bash_command=None):
+    if not isinstance(result, str):
+        return None
+    output = result.strip()
+    if not output:
+        return "The command finished with no output."
+
+    changed = re.fullmatch(r"Changed directory to (.+)", output)
+    if changed:
+        return f"You are now in {spoken_path(changed.group(1))}."
+
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    if len(lines) == 1 and re.fullmatch(r"\d+", lines[0]):
+        return f"The count is {lines[0]}."
+
+    directory = listing_directory(bash_command, cwd)
+    if directory is not None:
+        listing = verbalize_listing(lines, directory)
+        if listing is not None:
+            return listing
+
+    if len(lines) == 1 and os.path.isabs(lines[0]) and os.path.isdir(lines[0]) \
+            and (bash_command or "pwd").strip() == "pwd":
+        return f"You are in {spoken_path(lines[0])}."
+
+    # Paths that all exist, e.g. find output
+    if all(os.sep in line and os.path.exists(os.path.join(cwd, line)) for line in lines):
+        paths = [spoken_path(line) for line in lines]
+        found = "one item" if len(paths) == 1 else f"{len(paths)} items"
+        return f"I found {found}: {spoken_list(paths, MAX_SPOKEN_PATHS)}."
+
+    return None
@@ -0,0 +1,245 @@
+import functools
+import logging
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Create logs directory if it doesn't exist
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+# Generate timestamp for log filename
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(f"logs/blindsight_{timestamp}.log")
+    ]
+)
+
+# Create logger for the specific module
+logger = logging.getLogger(__name__)
+
+# Default location of the enrolled wake phrase templates, next to this file so a `cd` does not move it
+DEFAULT_TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wakeword_templates.npz")
+
+
+@functools.lru_cache(maxsize=4)
+def mel_filterbank(num_filters, nfft, sample_rate):
+    """
+    Builds a triangular mel filterbank matrix of shape (num_filters, nfft // 2 + 1).
+    """
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), num_filters + 2)
+    bins = np.floor((nfft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+
+    filterbank = np.zeros((num_filters, nfft // 2 + 1), dtype=np.float32)
+    for m in range(1, num_filters + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            filterbank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            filterbank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return filterbank
+
+
+@functools.lru_cache(maxsize=4)
+def dct_matrix(num_filters, num_ceps):
+    """
+    Builds an orthonormal DCT-II matrix of shape (num_filters, num_ceps).
+    """
+    n = np.arange(num_filters)
+    k = np.arange(num_ceps)
+    matrix = np.cos(np.pi / num_filters * (n[:, None] + 0.5) * k[None, :]) * np.sqrt(2.0 / num_filters)
+    matrix[:, 0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+def mfcc(audio, sample_rate=16000, num_ceps=13, frame_ms=25, hop_ms=10, num_filters=26, nfft=512):
+    """
+    Computes mean-normalized MFCC features for a mono int16 or float signal.
+
+    Args:
+        audio (numpy.ndarray): The samples.
+        sample_rate (int): Sample rate of the audio.
+
+    Returns:
+        numpy.ndarray: Array of shape (frames, num_ceps).
+    """
+    signal = np.asarray(audio).reshape(-1).astype(np.float32)
+    if np.asarray(audio).dtype == np.int16:
+        signal /= 32768.0
+
+    # Pre-emphasis boosts the high frequencies that carry consonants
+    signal = np.append(signal[:1], signal[1:] - 0.97 * signal[:-1])
+
+    frame_length = int(sample_rate * frame_ms / 1000)
+    hop_length = int(sample_rate * hop_ms / 1000)
+    if len(signal) < frame_length:
+        signal = np.pad(signal, (0, frame_length - len(signal)))
+
+    num_frames = 1 + (len(signal) - frame_length) // hop_length
+    indices = np.arange(frame_length)[None, :] + hop_length * np.arange(num_frames)[:, None]
+    frames = signal[indices] * np.hamming(frame_length).astype(np.float32)
+
+    power = np.abs(np.fft.rfft(frames, nfft)) ** 2 / nfft
+    energies = np.log(power @ mel_filterbank(num_filters, nfft, sample_rate).T + 1e-10)
+    ceps = energies @ dct_matrix(num_filters, num_ceps)
+    return ceps - ceps.mean(axis=0)
+
+
+def dtw_distance(a, b):
+    """
+    Dynamic time warping distance between two feature sequences, normalized by their lengths.
+    """
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+    n, m = cost.shape
+
+    previous = np.full(m + 1, np.inf)
+    previous[0] = 0.0
+    for i in range(n):
+        # Diagonal and vertical moves are vectorized, horizontal moves need a running scan
+        current = np.empty(m + 1)
+        current[0] = np.inf
+        current[1:] = cost[i] + np.minimum(previous[:-1], previous[1:])
+        for j in range(1, m + 1):
+            horizontal = current[j - 1] + cost[i, j - 1]
+            if horizontal < current[j]:
+                current[j] = horizontal
+        previous = current
+    return previous[m] / (n + m)
+
+
+class KeywordSpotter:
+    """
+    Matches speech segments against enrolled recordings of the wake phrase using MFCC + DTW.
+    """
+
+    def __init__(self, templates, threshold, sample_rate=16000):
+        self.templates = templates
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.min_length = min(len(t) for t in templates) * 0.5
+        self.max_length = max(len(t) for t in templates) * 1.5
+
+    @classmethod
+    def enroll(cls, recordings, sample_rate=16000, margin=1.2):
+        """
+        Builds a spotter from several recordings of the wake phrase.
+
+        The detection threshold is set from the spread between the enrolled examples.
+        """
+        templates = [mfcc(r, sample_rate) for r in recordings]
+        distances = [dtw_distance(a, b) for i, a in enumerate(templates) for b in templates[i + 1:]]
+        threshold = (max(distances) if distances else 1.0) * margin
+        logger.info(f"Enrolled {len(templates)} wake phrase templates with threshold {threshold:.3f}")
+        return cls(templates, threshold, sample_rate)
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Loads enrolled templates from disk.
+
+        Returns:
+            KeywordSpotter or None: The spotter, or None if no templates have been enrolled.
+        """
+        path = path or os.getenv("WAKEWORD_TEMPLATES", DEFAULT_TEMPLATES_PATH)
+        if not os.path.isfile(path):
+            return None
+        data = np.load(path)
+        templates = [data[key] for key in sorted(data.files) if key.startswith("template_")]
+        threshold = float(os.getenv("WAKEWORD_THRESHOLD", data["threshold"]))
+        logger.info(f"Loaded {len(templates)} wake phrase templates from {path}")
+        return cls(templates, threshold, int(data["sample_rate"]))
+
+    def save(self, path=None):
+        path = path or os.getenv("WAKEWORD_TEMPLATES", DEFAULT_TEMPLATES_PATH)
+        arrays = {f"template_{i:02d}": t for i, t in enumerate(self.templates)}
+        np.savez(path, threshold=self.threshold, sample_rate=self.sample_rate, **arrays)
+        logger.info(f"Saved wake phrase templates to {path}")
+
+    def match(self, audio):
+        """
+        Checks whether a speech segment is the wake phrase.
+
+        Returns:
+            tuple: (matched, best_distance)
+        """
+        features = mfcc(audio, self.sample_rate)
+        if not self.min_length <= len(features) <= self.max_length:
+            return False, np.inf
+        best = min(dtw_distance(features, t) for t in self.templates)
+        return best <= self.threshold, best
+
+
+def measure_idle_cpu(stt, seconds=60, window=7):
+    """
+    Compares the CPU used by idle wake listening against the old record-and-transcribe loop.
+
+    Args:
+        stt (STT): An initialized STT instance.
+        seconds (int): How long to measure each mode.
+        window (int): Recording length used by the old loop.
+    """
+    import resource
+
+    started_cpu = time.process_time()
+    started = time.perf_counter()
+    stt.wait_for_wake(timeout=seconds)
+    idle_cpu = time.process_time() - started_cpu
+    idle_wall = time.perf_counter() - started
+
+    main_path = os.environ['WHISPER_MAIN_PATH']
+    model_path = os.environ['WHISPER_MODEL_PATH']
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started_cpu = time.process_time()
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        stt.record_audio("idle_measure.wav", duration=window)
+        subprocess.run([main_path, "-m", model_path, "-f", "idle_measure.wav"], capture_output=True)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    loop_cpu = (time.process_time() - started_cpu
+                + children_after.ru_utime - children_before.ru_utime
+                + children_after.ru_stime - children_before.ru_stime)
+    loop_wall = time.perf_counter() - started
+    os.remove("idle_measure.wav")
+
+    print(f"Wake listening: {100 * idle_cpu / idle_wall:.1f}% of one core")
+    print(f"Record + whisper loop: {100 * loop_cpu / loop_wall:.1f}% of one core")
+
+
+if __name__ == "__main__":
+    from STT import STT
+    from audio_preprocess import resample, to_float
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("enroll", "measure"):
+        print("Usage: python wakeword.py enroll [examples] | measure [seconds]")
+        sys.exit(1)
+
+    stt = STT()
+    if not stt.microphone:
+        sys.exit(1)
+
+    if sys.argv[1] == "enroll":
+        examples = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+        recordings = []
+        for i in range(examples):
+            print(f"Say the wake phrase ({i + 1}/{examples})")
+            recording = stt.record_until_silence(max_duration=3, trailing_silence=0.4)
+            recordings.append(resample(to_float(recording), stt.input_rate))
+        KeywordSpotter.enroll(recordings).save()
+    else:
+        measure_idle_cpu(stt, seconds=int(sys.argv[2]) if len(sys.argv) > 2 else 60)
@@ -0,0 +1,60 @@
+import logging
+import re
+import subprocess
+
+# Helpers for the one-shot whisper.cpp binary. Importing this module has no side effects, so
+# worker processes can use it without opening the microphone or setting up logging.
+logger = logging.getLogger(__name__)
+
+
+def clean_whisper_output(raw_output):
+    """
+    Extracts plain text sentences from whisper.cpp output.
+
+    Parameters:
+        raw_output (str): Output of the whisper.cpp binary or server.
+
+    Returns:
+        str or None: The cleaned text split on sentence punctuation, or None if there is no text.
+    """
+    # Use regex to remove timestamps and keep only the sentences
+    sentences = re.findall(r"(?<=\]\s).*", raw_output)
+    if not sentences:
+        # The server's text response format has no timestamps
+        sentences = raw_output.splitlines()
+    plain_text = " ".join(sentence.strip() for sentence in sentences).strip()
+
+    if not plain_text:
+        return None
+
+    # Further split sentences using punctuation and join with proper spacing
+    return re.sub(r"([.?!])", r"\1\n", plain_text).strip()
+
+
+def run_whisper_cli(main_path, model_path, file_path, threads=None, pass_fds=()):
+    """
+    Runs the one-shot whisper.cpp binary on a WAV file and returns its raw output.
+
+    Parameters:
+        main_path (str): Path to the whisper.cpp main binary.
+        model_path (str): Path to the ggml model.
+        file_path (str): The WAV file to transcribe. It is never modified or deleted.
+        threads (int, optional): Number of decoding threads to pass with -t.
+        pass_fds (tuple): File descriptors the child process should inherit.
+
+    Returns:
+        str: The raw stdout of the binary.
+    """
+    # Construct the command
+    command = [
+        main_path,
+        "-m", model_path,
+        "-f", file_path
+    ]
+    if threads:
+        command += ["-t", str(threads)]
+
+    # Execute the command
+    logger.info(f"Running command: {' '.join(command)}")
+    result = subprocess.run(command, check=True, text=True, capture_output=True, pass_fds=pass_fds)
+    return result.stdout
@@ -0,0 +1,298 @@
+import http.client
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import atexit
+from datetime import datetime
+
+# Create logs directory if it doesn't exist
+if not os.path.exists('logs'):
+    os.makedirs('logs')
+
+# Generate timestamp for log filename
+timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(f"logs/blindsight_{timestamp}.log")
+    ]
+)
+
+# Create logger for the specific module
+logger = logging.getLogger(__name__)
+
+# Names the whisper.cpp server binary has shipped under
+SERVER_BINARY_NAMES = ["whisper-server", "server", "whisper-server.exe", "server.exe"]
+
+
+def find_server_binary(main_path):
+    """
+    Locates the whisper.cpp server binary next to the configured main binary.
+
+    Args:
+        main_path (str): Path to the whisper.cpp main binary (WHISPER_MAIN_PATH).
+
+    Returns:
+        str or None: Path to the server binary, or None if it could not be found.
+    """
+    server_path = os.getenv("WHISPER_SERVER_PATH")
+    if server_path:
+        return server_path if os.path.isfile(server_path) else None
+
+    if not main_path:
+        return None
+
+    base_dir = os.path.dirname(os.path.abspath(main_path))
+    for directory in [base_dir, os.path.join(base_dir, "build", "bin"), os.path.join(base_dir, "bin", "Release")]:
+        for name in SERVER_BINARY_NAMES:
+            candidate = os.path.join(directory, name)
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+
+def _free_port():
+    """
+    Asks the OS for a free TCP port on the loopback interface.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class WhisperEngine:
+    """
+    Keeps a whisper.cpp server process running so the model is loaded once,
+    and sends audio to it over a local HTTP socket.
+
+    The child process is supervised by a watchdog thread and restarted if it dies.
+    """
+
+    def __init__(self, server_path, model_path, threads=None, startup_timeout=30.0):
+        self.server_path = server_path
+        self.model_path = model_path
+        self.threads = threads
+        self.startup_timeout = startup_timeout
+        self.host = "127.0.0.1"
+        self.port = None
+        self.process = None
+        self.connection = None
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watchdog = None
+
+    @classmethod
+    def from_env(cls, threads=None, model_path=None):
+        """
+        Builds and starts an engine from WHISPER_MAIN_PATH / WHISPER_MODEL_PATH.
+
+        Args:
+            threads (int, optional): Number of decoding threads.
+            model_path (str, optional): Model to load instead of WHISPER_MODEL_PATH.
+
+        Returns:
+            WhisperEngine or None: A running engine, or None if the server binary is unavailable.
+        """
+        main_path = os.getenv("WHISPER_MAIN_PATH")
+        model_path = model_path or os.getenv("WHISPER_MODEL_PATH")
+        server_path = find_server_binary(main_path)
+
+        if not server_path or not model_path or not os.path.isfile(model_path):
+            logger.info("Whisper server binary or model not found. Falling back to one-shot transcription.")
+            return None
+
+        engine = cls(server_path, model_path, threads=threads)
+        try:
+            engine.start()
+        except Exception as e:
+            logger.error(f"Failed to start the whisper server: {e}")
+            engine.stop()
+            return None
+        return engine
+
+    def start(self):
+        """
+        Spawns the server process, waits until it accepts connections and starts the watchdog.
+        """
+        with self._lock:
+            self._spawn()
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._supervise, daemon=True)
+            self._watchdog.start()
+        atexit.register(self.stop)
+
+    def _spawn(self):
+        self.port = _free_port()
+        command = [
+            self.server_path,
+            "-m", self.model_path,
+            "--host", self.host,
+            "--port", str(self.port)
+        ]
+        if self.threads:
+            command += ["-t", str(self.threads)]
+
+        logger.info(f"Starting whisper server: {' '.join(command)}")
+        started = time.perf_counter()
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.connection = None
+
+        deadline = started + self.startup_timeout
+        while time.perf_counter() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"whisper server exited with code {self.process.returncode}")
+            try:
+                with socket.create_connection((self.host, self.port), timeout=0.5):
+                    logger.info(f"Whisper server ready on port {self.port} in {time.perf_counter() - started:.2f}s")
+                    return
+            except OSError:
+                time.sleep(0.1)
+        raise TimeoutError("whisper server did not start in time")
+
+    def _supervise(self):
+        """
+        Watchdog loop that restarts the server if the process exits unexpectedly.
+        """
+        while not self._stopped.wait(1.0):
+            with self._lock:
+                if self.process is not None and self.process.poll() is not None:
+                    logger.error(f"Whisper server died (exit code {self.process.returncode}). Restarting.")
+                    self.restarts += 1
+                    try:
+                        self._spawn()
+                    except Exception as e:
+                        logger.error(f"Failed to restart the whisper server: {e}")
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def transcribe(self, wav_data, retry=True):
+        """
+        Sends a WAV payload to the resident server and returns its raw text output.
+
+        Args:
+            wav_data (bytes or list): A complete WAV file (16 kHz, 16-bit mono), either as bytes
+                or as a list of bytes-like chunks that are streamed without being joined.
+            retry (bool): Restart the server and retry once if the request fails.
+
+        Returns:
+            str: The raw transcription returned by the server.
+        """
+        if isinstance(wav_data, (bytes, bytearray, memoryview)):
+            wav_data = [wav_data]
+
+        boundary = uuid.uuid4().hex
+        body = [
+            f"--{boundary}\r\n".encode(),
+            b'Content-Disposition: form-data; name="file"; filename="audio.wav"\r\n',
+            b"Content-Type: audio/wav\r\n\r\n",
+            *wav_data,
+            f"\r\n--{boundary}\r\n".encode(),
+            b'Content-Disposition: form-data; name="response_format"\r\n\r\n',
+            b"text",
+            f"\r\n--{boundary}--\r\n".encode()
+        ]
+        headers = {
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+            "Content-Length": str(sum(memoryview(part).nbytes for part in body))
+        }
+
+        with self._lock:
+            try:
+                if not self.is_alive():
+                    raise ConnectionError("whisper server is not running")
+                if self.connection is None:
+                    self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+                self.connection.request("POST", "/inference", body=body, headers=headers)
+                response = self.connection.getresponse()
+                payload = response.read().decode("utf-8", errors="replace")
+                if response.status != 200:
+                    raise RuntimeError(f"whisper server returned {response.status}: {payload}")
+                return payload
+            except Exception as e:
+                if self.connection is not None:
+                    self.connection.close()
+                    self.connection = None
+                if not retry:
+                    raise
+                logger.error(f"Whisper server request failed: {e}. Restarting the server.")
+                self.restarts += 1
+                self._terminate()
+                self._spawn()
+
+        return self.transcribe(wav_data, retry=False)
+
+    def _terminate(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def stop(self):
+        """
+        Stops the watchdog and terminates the server process.
+        """
+        self._stopped.set()
+        with self._lock:
+            self._terminate()
+
+
+def benchmark(wav_path, runs=5):
+    """
+    Compares per-utterance latency of the one-shot whisper.cpp binary against the resident server.
+
+    Args:
+        wav_path (str): A 16 kHz WAV file to transcribe.
+        runs (int): Number of transcriptions per mode.
+    """
+    main_path = os.environ['WHISPER_MAIN_PATH']
+    model_path = os.environ['WHISPER_MODEL_PATH']
+
+    one_shot = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([main_path, "-m", model_path, "-f", wav_path], check=True, capture_output=True)
+        one_shot.append(time.perf_counter() - started)
+
+    engine = WhisperEngine.from_env()
+    if engine is None:
+        print("Whisper server is not available; only the one-shot timings were measured.")
+        resident = []
+    else:
+        with open(wav_path, "rb") as f:
+            wav_bytes = f.read()
+        resident = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            engine.transcribe(wav_bytes)
+            resident.append(time.perf_counter() - started)
+        engine.stop()
+
+    for label, timings in [("one-shot", one_shot), ("resident", resident)]:
+        if timings:
+            print(f"{label:>9}: mean {sum(timings) / len(timings):.3f}s  min {min(timings):.3f}s  max {max(timings):.3f}s")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if len(sys.argv) < 2:
+        print("Usage: python whisper_engine.py <file.wav> [runs]")
+        sys.exit(1)
+    benchmark(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 5)